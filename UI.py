@@ -1,5 +1,6 @@
 import pygame
 import numpy as np
+from assets import assets
 
 pygame.font.init()
 
@@ -11,7 +12,7 @@ def put_text(surface: pygame.Surface, font_path: str = None, font_size: int = 50
     This puts text on the screen.
     """
 
-    text_font = pygame.font.Font(font_path, font_size)
+    text_font = assets.get_font(font_path, font_size)
     text_font.set_underline(is_underlined)
     text_font.set_bold(is_bold)
     text_font.set_italic(is_italic)
@@ -35,7 +36,7 @@ class Button(pygame.sprite.Sprite):
         self.pos = pygame.Vector2(pos)
 
         if image:
-            self.image = pygame.image.load(image).convert_alpha()
+            self.image = assets.get_image(image, is_converted=True).copy()
         else:
             # If there is no button image make a white button with a size of 200x50
             self.image = pygame.Surface((width, height))
@@ -114,7 +115,7 @@ class CircleButton(Button):
         self.radius = radius
 
         if image:
-            self.image = pygame.image.load(image).convert_alpha()
+            self.image = assets.get_image(image, is_converted=True).copy()
         else:
             self.image = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
             pygame.draw.circle(self.image, self.color, (radius, radius), radius)
@@ -0,0 +1,153 @@
+"""
+Loads every sound, image and font once and hands the same object to everyone who asks for it.
+
+Assets are loaded lazily, the first time they're asked for; preload() loads them up front instead, so the first
+use doesn't cost a frame. Long tracks aren't decoded into memory at all but streamed through pygame.mixer.music, which
+plays one track at a time.
+
+Usage: python assets.py     Loads everything in Music and Images and prints how much memory each asset takes
+"""
+
+import os
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from os.path import normpath, getsize, dirname, join as path_join
+import pygame
+
+
+class AssetManager:
+    def __init__(self):
+        self.sounds = {}
+        self.images = {}
+        self.fonts = {}
+
+        self.music_path = None
+
+    def get_sound(self, path, volume=None):
+        """
+        The sound is shared, so setting its volume changes it for everyone who plays it.
+        """
+
+        path = normpath(path)
+
+        if path not in self.sounds:
+            self.sounds[path] = pygame.mixer.Sound(path)
+
+        sound = self.sounds[path]
+        if volume is not None:
+            sound.set_volume(volume)
+
+        return sound
+
+    def get_image(self, path, is_converted=False):
+        """
+        is_converted converts the image to the display's pixel format (with alpha) for faster blits, which needs the
+        display to be set up. The image is shared, copy it before drawing on it.
+        """
+
+        key = (normpath(path), is_converted)
+
+        if key not in self.images:
+            image = self.images[(key[0], False)] if (key[0], False) in self.images else pygame.image.load(key[0])
+            self.images[key] = image.convert_alpha() if is_converted else image
+
+        return self.images[key]
+
+    def get_font(self, path=None, size=50):
+        """
+        path None is pygame's default font.
+        """
+
+        key = (normpath(path) if path else None, size)
+
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.Font(key[0], size)
+
+        return self.fonts[key]
+
+    def preload(self, sounds=(), images=()):
+        for path in sounds:
+            self.get_sound(path)
+
+        for path in images:
+            self.get_image(path)
+
+    def play_music(self, path, volume=1.0, loops=-1, fade_ms=0):
+        """
+        Streams the track, replacing whatever track was playing. Does nothing if the track is already playing.
+        """
+
+        path = normpath(path)
+
+        if path == self.music_path and pygame.mixer.music.get_busy():
+            return
+
+        try:
+            pygame.mixer.music.load(path)
+        except (pygame.error, FileNotFoundError) as error:
+            print(f"COULDN'T PLAY {path}! {error}")
+            self.stop_music()  # It would have been replaced all the same
+            return
+
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops, fade_ms=fade_ms)
+        self.music_path = path
+
+    def stop_music(self, path=None, fade_ms=0):
+        """
+        Stops the music, but only if path is the track that's playing (or path is None), so one screen can't cut off
+        the track another screen has started since.
+        """
+
+        if self.music_path is None or (path is not None and normpath(path) != self.music_path):
+            return
+
+        if fade_ms:
+            pygame.mixer.music.fadeout(fade_ms)
+        else:
+            pygame.mixer.music.stop()
+
+        self.music_path = None
+
+    def get_memory_report(self):
+        """
+        Returns (kind, name, bytes) for every loaded asset, biggest first. Sounds and images are counted by their
+        decoded size, fonts by their file size. The streamed track only ever holds a small decode buffer, so it's
+        left out.
+        """
+
+        report = []
+
+        frequency, sample_format, n_channels = pygame.mixer.get_init() or (0, 0, 0)
+        for path, sound in self.sounds.items():
+            report.append(("sound", path, round(sound.get_length() * frequency) * abs(sample_format) // 8 * n_channels))
+
+        for (path, is_converted), image in self.images.items():
+            report.append(("image", f"{path} (converted)" if is_converted else path, image.get_pitch() * image.get_height()))
+
+        default_font_path = path_join(dirname(pygame.__file__), pygame.font.get_default_font())
+        for (path, size), font in self.fonts.items():
+            report.append(("font", f"{path or 'default font'} ({size}px)", getsize(path or default_font_path)))
+
+        return sorted(report, key=lambda row: row[2], reverse=True)
+
+    def print_memory_report(self):
+        report = self.get_memory_report()
+
+        for kind, name, n_bytes in report:
+            print(f"{kind:<6}{n_bytes / 1024:>10.1f} KiB  {name}")
+        print(f"{'total':<6}{sum(row[2] for row in report) / 1024:>10.1f} KiB")
+
+
+assets = AssetManager()
+
+
+if __name__ == "__main__":
+    pygame.init()
+
+    assets.preload(sounds=[path_join("Music", name) for name in os.listdir("Music") if name.endswith(".wav")],
+                   images=[path_join("Images", name) for name in os.listdir("Images") if name.endswith(".png")])
+    assets.print_memory_report()
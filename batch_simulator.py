@@ -0,0 +1,276 @@
+"""
+Advances many independent GameMode1 runs in lockstep with NumPy, to get survival time distributions per difficulty
+without playing the game by hand.
+
+The rules and constants come from GameRules and Grid. Every run slides right at the same speed, so the player's
+column (and with it the column obstacles spawn in) is shared by all runs and only the vertical movement differs.
+Obstacles live in a ring of columns that reaches from just behind the player up to the spawn column; columns behind
+the player can never be hit again so they are simply overwritten.
+
+GameRules.clear_obstacles removes obstacles that fall too far above or below the player. Only the spawn column has
+to be cleared eagerly (clearing it lets the column spawn again on the next frame), for every other column the
+smallest and largest player row since the column spawned is enough to tell if an obstacle would have been cleared.
+
+Usage: python batch_simulator.py --runs 1000000 --processes 8 --policy random
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+from multiprocessing import Pool
+from time import perf_counter
+import numpy as np
+import settings
+from grid import Grid
+from game_mode1 import GameRules
+
+
+def get_constants(difficulty="EASY", window_size=(1920, 1080), n_vertical_tiles=10):
+    """
+    Reads everything the simulation needs out of a real Grid and GameRules, as plain values that can be sent to the
+    worker processes.
+    """
+
+    settings.WINDOW_SIZE = window_size
+
+    grid = Grid("GRAY", (window_size[1] // n_vertical_tiles, window_size[1] // n_vertical_tiles))
+    rules = GameRules(grid, None, difficulty)
+
+    # These mirror GameRules.generate_obstacle_positions
+    return {
+        "difficulty": difficulty,
+        "tile_size": grid.tile_width,
+        "spawn_offset": grid.line_width // grid.tile_width,
+        "y_range": round(grid.line_height // grid.tile_height * 3),
+        "max_spawn_n": max(1, int((grid.max_y - grid.min_y) * rules.spawn_amount // grid.tile_height)),
+        "player_pos": tuple(rules.player.pos),
+        "player_size": rules.player.size,
+        "sliding_speed": rules.SCREEN_SLIDING_SPEED,
+        "movement_speed": rules.MOVEMENT_SPEED,
+        "sample_every": rules.update_movement_every_n_frames + 1,
+    }
+
+
+class StillPolicy:
+    def __init__(self, rng, n):
+        self.state = {}
+
+    def sample(self, rng, sample_n, n):
+        return np.zeros(n)
+
+
+class RandomPolicy:
+    """A new random percentage every "hold" samples, like headless.random_script."""
+
+    def __init__(self, rng, n, hold=5):
+        self.hold = hold
+        self.state = {"value": np.zeros(n)}
+
+    def sample(self, rng, sample_n, n):
+        if sample_n % self.hold == 0:
+            self.state["value"] = rng.uniform(-1, 1, n)
+
+        return self.state["value"]
+
+
+class SinePolicy:
+    """Smooth push-ups with a random pace and starting point per run."""
+
+    def __init__(self, rng, n):
+        self.state = {"period": rng.uniform(20, 60, n), "phase": rng.uniform(0, 2 * np.pi, n)}
+
+    def sample(self, rng, sample_n, n):
+        return np.sin(2 * np.pi * sample_n / self.state["period"] + self.state["phase"])
+
+
+POLICIES = {"still": StillPolicy, "random": RandomPolicy, "sine": SinePolicy}
+
+
+def simulate_chunk(constants, policy_name, n_runs, seed, max_frames):
+    """
+    Simulates n_runs runs and returns the number of frames each one survived (max_frames if it never died).
+    """
+
+    rng = np.random.default_rng(seed)
+
+    tile_size = constants["tile_size"]
+    spawn_offset = constants["spawn_offset"]
+    y_range = constants["y_range"]
+    max_spawn_n = constants["max_spawn_n"]
+    player_x_pos, player_y_pos = constants["player_pos"]
+    player_size = constants["player_size"]
+
+    n_columns = spawn_offset + 3  # The column behind the player up to the spawn column
+    n_slots = 2 * max_spawn_n  # Room for a column to spawn again after it has been cleared
+
+    run_ids = np.arange(n_runs)
+    survived_frames = np.full(n_runs, max_frames, dtype=np.int32)
+
+    n = n_runs
+    is_alive = np.ones(n, dtype=bool)
+    shift_y = np.zeros(n)
+    movement_y = np.zeros(n)
+    obstacle_y = np.zeros((n, n_columns, n_slots), dtype=np.int32)
+    obstacle_alive = np.zeros((n, n_columns, n_slots), dtype=bool)
+    window_min = np.zeros((n, n_columns), dtype=np.int32)
+    window_max = np.zeros((n, n_columns), dtype=np.int32)
+    needs_spawn = np.zeros(n, dtype=bool)
+
+    policy = POLICIES[policy_name](rng, n)
+
+    shift_x = 0
+    sample_n = 0
+    spawned_column = None
+
+    for frame_n in range(max_frames):
+        # Game.screen_sliding and Game.move_around
+        shift_x -= constants["sliding_speed"]
+
+        if (frame_n + 1) % constants["sample_every"] == 0:
+            movement_y = constants["movement_speed"] * np.clip(policy.sample(rng, sample_n, n), -1, 1)
+            sample_n += 1
+
+        shift_y += movement_y
+
+        player_column = int((player_x_pos - shift_x) // tile_size)
+        player_row = ((player_y_pos - shift_y) // tile_size).astype(np.int32)
+
+        np.minimum(window_min, player_row[:, None], out=window_min)
+        np.maximum(window_max, player_row[:, None], out=window_max)
+
+        # GameRules.check_collisions, only the columns the player overlaps can be hit
+        has_collided = np.zeros(n, dtype=bool)
+
+        for column in (player_column - 1, player_column, player_column + 1):
+            left = column * tile_size + shift_x
+
+            if player_x_pos + player_size <= left or player_x_pos - player_size > left + tile_size:
+                continue
+
+            slot = column % n_columns
+            rows = obstacle_y[:, slot]
+            tops = rows * tile_size + shift_y[:, None]
+
+            is_valid = (obstacle_alive[:, slot] & (rows >= (window_max[:, slot] - y_range)[:, None]) &
+                        (rows <= (window_min[:, slot] + y_range)[:, None]))
+            has_collided |= (is_valid & (player_y_pos + player_size > tops) &
+                             (player_y_pos - player_size <= tops + tile_size)).any(axis=1)
+
+        has_died = is_alive & has_collided
+        survived_frames[run_ids[has_died]] = frame_n + 1
+        is_alive &= ~has_collided
+
+        if not is_alive.any():
+            break
+
+        if (~is_alive).sum() * 4 > n:  # Drops the dead runs once they are a quarter of the arrays
+            run_ids, shift_y, movement_y, player_row = run_ids[is_alive], shift_y[is_alive], movement_y[is_alive], player_row[is_alive]
+            obstacle_y, obstacle_alive = obstacle_y[is_alive], obstacle_alive[is_alive]
+            window_min, window_max, needs_spawn = window_min[is_alive], window_max[is_alive], needs_spawn[is_alive]
+            policy.state = {key: value[is_alive] for key, value in policy.state.items()}
+
+            is_alive = is_alive[is_alive]
+            n = len(is_alive)
+
+        # GameRules.generate_obstacles
+        spawn_column = player_column + spawn_offset
+        slot = spawn_column % n_columns
+
+        if spawn_column != spawned_column:
+            spawned_column = spawn_column
+            obstacle_alive[:, slot] = False
+            needs_spawn[:] = True
+
+        if needs_spawn.any():
+            spawn_ids = np.nonzero(needs_spawn)[0]
+            rows = player_row[spawn_ids]
+
+            counts = rng.integers(1, max_spawn_n + 1, len(spawn_ids))
+            new_rows = rng.integers((rows - y_range)[:, None], (rows + y_range + 1)[:, None], (len(spawn_ids), max_spawn_n))
+
+            # Fills the free slots first; anything that doesn't fit is dropped
+            slot_alive = obstacle_alive[spawn_ids, slot]
+            targets = np.argsort(slot_alive, axis=1, kind="stable")[:, :max_spawn_n]
+            to_write = (np.arange(max_spawn_n) < counts[:, None]) & ~np.take_along_axis(slot_alive, targets, axis=1)
+
+            old_rows = np.take_along_axis(obstacle_y[spawn_ids, slot], targets, axis=1)
+            obstacle_y[spawn_ids[:, None], slot, targets] = np.where(to_write, new_rows, old_rows)
+            obstacle_alive[spawn_ids[:, None], slot, targets] |= to_write
+
+            window_min[spawn_ids, slot] = rows
+            window_max[spawn_ids, slot] = rows
+            needs_spawn[:] = False
+
+        # GameRules.clear_obstacles, for the spawn column
+        rows = obstacle_y[:, slot]
+        is_cleared = obstacle_alive[:, slot] & ((rows < (player_row - y_range)[:, None]) |
+                                                (rows > (player_row + y_range)[:, None]))
+
+        obstacle_alive[:, slot] &= ~is_cleared
+        needs_spawn = is_cleared.any(axis=1)
+
+    return survived_frames
+
+
+def _simulate_chunk(args):
+    return simulate_chunk(*args)
+
+
+def simulate(difficulty="EASY", n_runs=10000, policy_name="random", seed=None, max_frames=settings.FPS * 300,
+             chunk_size=8192, processes=None, window_size=(1920, 1080)):
+    """
+    Returns the survival time in seconds of every run, spreading the runs across a process pool in chunks.
+    """
+
+    constants = get_constants(difficulty, window_size)
+    seeds = np.random.SeedSequence(seed).spawn((n_runs + chunk_size - 1) // chunk_size)
+    chunks = [(constants, policy_name, min(chunk_size, n_runs - i * chunk_size), chunk_seed, max_frames)
+              for i, chunk_seed in enumerate(seeds)]
+
+    if processes == 1:
+        results = [_simulate_chunk(chunk) for chunk in chunks]
+    else:
+        with Pool(processes) as pool:
+            results = pool.map(_simulate_chunk, chunks)
+
+    return np.concatenate(results) / settings.FPS
+
+
+def summarise(difficulty, survival_times, max_time):
+    percentiles = np.percentile(survival_times, [10, 25, 50, 75, 90, 99])
+
+    return (f"{difficulty:<6} runs {len(survival_times):>9} | mean {survival_times.mean():7.2f}s | "
+            + " ".join(f"p{p} {value:.2f}s" for p, value in zip((10, 25, 50, 75, 90, 99), percentiles))
+            + f" | alive at {max_time:.0f}s: {(survival_times >= max_time).mean() * 100:.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulates many GameMode1 runs per difficulty with NumPy.")
+    parser.add_argument("--difficulties", nargs="+", default=list(GameRules.SPAWN_AMOUNTS))
+    parser.add_argument("--runs", type=int, default=100000, help="Runs per difficulty")
+    parser.add_argument("--policy", default="random", choices=list(POLICIES))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--max-time", type=float, default=300, help="Seconds of game time before a run is stopped")
+    parser.add_argument("--chunk-size", type=int, default=8192)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--out", default=None, help="Saves the survival times per difficulty to this .npz file")
+    args = parser.parse_args()
+
+    distributions = {}
+
+    for difficulty in args.difficulties:
+        start = perf_counter()
+        distributions[difficulty] = simulate(difficulty, args.runs, args.policy, args.seed,
+                                             round(args.max_time * settings.FPS), args.chunk_size, args.processes)
+
+        print(summarise(difficulty, distributions[difficulty], args.max_time), f"| took {perf_counter() - start:.1f}s")
+
+    if args.out:
+        np.savez_compressed(args.out, **distributions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Benchmarks for the code that runs every frame. Everything runs headless with the SDL dummy drivers, the camera is
+replaced by synthetic frames and the database by a temporary one.
+
+Each benchmark is timed in several rounds and the fastest round (the least disturbed by the rest of the system) is
+compared against a stored baseline, so a slowdown beyond the tolerance shows up as a regression (and a non-zero
+exit code).
+
+benchmark_baseline.json is a reference run on one core of an x86-64 Xeon with Python 3.11, pygame 2.6 and numpy 2.4.
+Timings only compare on the same machine: before measuring a change elsewhere, run --save-baseline on the unchanged
+tree first. Refresh the committed file with --save-baseline when a change is meant to move the numbers, and commit it
+together with that change.
+
+--check-allocations is the regression test for the allocation-free MIDDLE GAME loop. It exits with 1 when the frame
+goes over one of the budgets below, so CI runs it as a step of its own:
+    python benchmarks.py --check-allocations
+It needs no camera, display or game.db and takes about 20 seconds. Unlike the timings it needs no baseline.
+
+Usage:
+    python benchmarks.py                      Runs everything and compares against benchmark_baseline.json
+    python benchmarks.py --save-baseline      Stores the results as the new baseline
+    python benchmarks.py --filter grid        Only runs the benchmarks whose name contains "grid"
+    python benchmarks.py --check-allocations  Checks the real MIDDLE GAME frame against the allocation budgets below
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import tempfile
+
+os.environ.setdefault("MUSCLE_SURVIVORS_DB", os.path.join(tempfile.mkdtemp(), "benchmark.db"))
+
+import argparse
+from array import array
+import gc
+import tracemalloc
+import json
+import random
+from statistics import median
+from time import perf_counter
+import numpy as np
+import pygame
+import settings
+import UI
+import database
+from grid import Grid
+from game_mode1 import GameRules, Tile
+from headless import ScriptedMovementAnalyser, sine_script
+from movement_analyser import MovementAnalyser
+
+pygame.init()
+
+RESOLUTIONS = ((1280, 720), (1920, 1080), (3840, 2160))
+OBSTACLE_COUNTS = (10, 100, 1000)
+SCORE_TABLE_SIZES = (10_000, 1_000_000)
+CAMERA_FRAME_SIZES = ((640, 480), (1280, 720))
+
+# Allocation budgets of a steady-state MIDDLE GAME frame of Game.run_frame, as traced by tracemalloc. Memory that is
+# allocated and freed within a frame still has to come from somewhere and feeds the garbage collector, the retained
+# memory is what the heap keeps growing by.
+ALLOCATION_WARMUP_FRAMES = 2000
+ALLOCATION_FRAMES = 3000
+MAX_MEDIAN_FRAME_PEAK = 1024  # Bytes
+MAX_P99_FRAME_PEAK = 8192  # Bytes, the frames that spawn a column of obstacles or render the HUD text
+MAX_RETAINED_PER_FRAME = 32  # Bytes
+
+
+def make_grid(window_size):
+    settings.WINDOW_SIZE = window_size
+    return Grid("GRAY", (window_size[1] // 10, window_size[1] // 10))
+
+
+def make_rules(n_obstacles):
+    """
+    Returns GameRules with n_obstacles obstacles around the player that are never hit and never cleared.
+    """
+
+    rules = GameRules(make_grid((1920, 1080)), ScriptedMovementAnalyser(), "HARD", rng=random.Random(0))
+    player_x, player_y = rules.grid.convert_local_coordinates_to_pos(rules.player.pos)
+
+    rng = random.Random(0)
+    for _ in range(n_obstacles):
+        rules.obstacles.append(Tile((rng.randint(player_x + 2, player_x + 40), rng.randint(player_y - 25, player_y + 25)),
+                                    (230, 10, 20)))
+
+    return rules
+
+
+def bench_grid_update(window_size):
+    grid = make_grid(window_size)
+    shift = pygame.Vector2(0, 0)
+
+    def run():
+        shift.x -= 5
+        shift.y += 3
+        grid.update(shift)
+
+    return run
+
+
+def bench_grid_draw(window_size):
+    grid = make_grid(window_size)
+    screen = pygame.Surface(window_size)
+
+    return lambda: grid.draw(screen)
+
+
+def bench_check_collisions(n_obstacles):
+    return make_rules(n_obstacles).check_collisions
+
+
+def bench_generate_obstacles(n_obstacles):
+    rules = make_rules(n_obstacles)
+    positions = rules.generate_obstacle_positions(rules.grid.convert_local_coordinates_to_pos(rules.player.pos))
+
+    def run():
+        rules.generate_obstacles(positions)
+
+        del rules.obstacles[n_obstacles:]
+        rules.obstacle_summoned.clear()
+
+    return run
+
+
+def bench_clear_obstacles(n_obstacles):
+    return make_rules(n_obstacles).clear_obstacles
+
+
+def bench_put_text():
+    screen = pygame.Surface((1920, 1080))
+    return lambda: UI.put_text(screen, text="Time Survived: 123s", pos=(30, 30), anchor="TOPLEFT")
+
+
+def bench_table_generate_image():
+    table = UI.Table((300, 300), title="EASY Mode Leaderboard", title_bg_color="#a8ca58", bg_color="#d0da91",
+                     font_size=25, has_outline=True, cell_width=125, cell_height=40, row_n=4,
+                     column_labels=["Player Name", "Score"], data=[("PLAYER1", 120), ("PLAYER2", 95), ("PLAYER3", 40)])
+    return table.generate_image
+
+
+def bench_get_high_scores(n_rows):
+    pool = database.open_database(os.path.join(tempfile.mkdtemp(), "benchmark.db"))
+    rng = random.Random(0)
+
+    with pool.connection() as connection, database.write_transaction(connection):
+        connection.executemany("INSERT INTO accounts VALUES (?, ?)", ((f"PLAYER{i}", "password") for i in range(1000)))
+        connection.executemany("INSERT INTO scores (playerName, difficulty, score) VALUES (?, ?, ?)",
+                               ((f"PLAYER{rng.randrange(1000)}", rng.choice(("EASY", "NORMAL", "HARD")), rng.randrange(600))
+                                for _ in range(n_rows)))
+
+    return lambda: database.get_high_scores("HARD", 3)
+
+
+def bench_movement_preprocess(frame_size):
+    frame = np.random.default_rng(0).integers(0, 256, (frame_size[1], frame_size[0], 3), dtype=np.uint8)
+    return lambda: MovementAnalyser.preprocess_image(frame)
+
+
+BENCHMARKS = {
+    **{f"grid_update@{w}x{h}": (bench_grid_update, (w, h)) for w, h in RESOLUTIONS},
+    **{f"grid_draw@{w}x{h}": (bench_grid_draw, (w, h)) for w, h in RESOLUTIONS},
+    **{f"check_collisions@{n}": (bench_check_collisions, n) for n in OBSTACLE_COUNTS},
+    **{f"generate_obstacles@{n}": (bench_generate_obstacles, n) for n in OBSTACLE_COUNTS},
+    **{f"clear_obstacles@{n}": (bench_clear_obstacles, n) for n in OBSTACLE_COUNTS},
+    "put_text": (bench_put_text, None),
+    "table_generate_image": (bench_table_generate_image, None),
+    **{f"get_high_scores@{n}": (bench_get_high_scores, n) for n in SCORE_TABLE_SIZES},
+    **{f"movement_preprocess@{w}x{h}": (bench_movement_preprocess, (w, h)) for w, h in CAMERA_FRAME_SIZES},
+}
+
+
+def make_middle_game_frame():
+    """
+    Returns a function that runs one real frame of Game.main_loop (Game.run_frame) in MIDDLE GAME, with a scripted
+    player and no frame cap, and returns whether the run is still going. A run that ends is put straight back into
+    MIDDLE GAME with its obstacles cleared, so the frames can go on forever.
+    """
+
+    from main import Game  # Only here, it opens the (dummy) display
+
+    settings.FPS = 0  # Game.run_frame's clock.tick doesn't wait
+    settings.IDLE_MAINTENANCE = False  # Its thread's allocations would be counted too
+
+    settings.user = "BENCHMARK"
+    database.insert_player(settings.user, "password")
+
+    game = Game()
+    game.game_mode1.movement_analyser.close_analyser()
+    game.game_mode1.movement_analyser = ScriptedMovementAnalyser(sine_script())
+    game.game_mode1.set_difficulty("HARD")
+    game.game_mode1.start_run()
+    game.game_mode1.rng = random.Random(0)
+    game.game_mode1.game_timer.start()
+    settings.game_state = "MIDDLE GAME"
+
+    def run():
+        game.run_frame()
+
+        if settings.game_state == "MIDDLE GAME":
+            return True
+
+        game.score_writer.flush()  # So the writer thread is done before the next frame is measured
+        game.game_mode1.obstacles.clear()
+        settings.game_state = "MIDDLE GAME"
+        return False
+
+    return run
+
+
+def check_allocations():
+    """
+    Returns whether the MIDDLE GAME frame stays within the allocation budgets. The frames that end a run (writing the
+    score, the GAME OVER summary) aren't part of the budgets and are only counted.
+    """
+
+    frame = make_middle_game_frame()
+    for _ in range(ALLOCATION_WARMUP_FRAMES):
+        frame()
+
+    gc.collect()
+    gc.disable()  # So a collection can't free memory in the middle of the measurement
+    tracemalloc.start()
+
+    peaks = array("q", bytes(8 * ALLOCATION_FRAMES))  # Preallocated, so the measurement doesn't count itself
+    n_measured = 0
+    start_memory, _ = tracemalloc.get_traced_memory()
+
+    for _ in range(ALLOCATION_FRAMES):
+        frame_start_memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        if frame():
+            peaks[n_measured] = tracemalloc.get_traced_memory()[1] - frame_start_memory
+            n_measured += 1
+
+    end_memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.enable()
+
+    peaks = sorted(peaks[:n_measured])
+    results = (("median frame peak", peaks[len(peaks) // 2], MAX_MEDIAN_FRAME_PEAK),
+               ("p99 frame peak", peaks[int(len(peaks) * 0.99)], MAX_P99_FRAME_PEAK),
+               ("retained per frame", (end_memory - start_memory) / ALLOCATION_FRAMES, MAX_RETAINED_PER_FRAME))
+
+    print(f"{n_measured} MIDDLE GAME frames at {settings.WINDOW_SIZE[0]}x{settings.WINDOW_SIZE[1]} measured, "
+          f"{ALLOCATION_FRAMES - n_measured} that ended a run left out")
+    print(f"{'ALLOCATIONS':<32}{'BYTES':>12}{'BUDGET':>12}")
+    for name, n_bytes, budget in results:
+        print(f"{name:<32}{n_bytes:>12.0f}{budget:>12}{'  OVER BUDGET' if n_bytes > budget else ''}")
+
+    return all(n_bytes <= budget for _, n_bytes, budget in results)
+
+
+def time_function(function, rounds=7, min_round_time=0.05):
+    """
+    Returns the median and the minimum seconds per call over the rounds. The number of calls per round is picked so
+    a round lasts at least min_round_time, which keeps the timer resolution out of the results.
+    """
+
+    function()  # Warm up
+
+    n_calls = 1
+    while True:
+        start = perf_counter()
+        for _ in range(n_calls):
+            function()
+        if perf_counter() - start >= min_round_time:
+            break
+        n_calls *= 2
+
+    round_times = []
+    for _ in range(rounds):
+        start = perf_counter()
+        for _ in range(n_calls):
+            function()
+        round_times.append((perf_counter() - start) / n_calls)
+
+    return median(round_times), min(round_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the game's hot paths.")
+    parser.add_argument("--filter", default="", help="Only runs the benchmarks whose name contains this")
+    parser.add_argument("--baseline", default="benchmark_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before it counts as a regression")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--check-allocations", action="store_true", help="Checks the allocation budgets instead of timing")
+    args = parser.parse_args()
+
+    if args.check_allocations:
+        if not check_allocations():
+            raise SystemExit(1)
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    results = {}
+    regressions = []
+
+    print(f"{'BENCHMARK':<32}{'MEDIAN':>12}{'MIN':>12}{'BASELINE':>12}{'CHANGE':>10}")
+
+    for name, (setup, argument) in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+
+        function = setup() if argument is None else setup(argument)
+        median_time, min_time = time_function(function, args.rounds)
+        results[name] = min_time
+
+        line = f"{name:<32}{median_time * 1e6:>10.2f}us{min_time * 1e6:>10.2f}us"
+
+        if name in baseline:
+            change = min_time / baseline[name] - 1
+            line += f"{baseline[name] * 1e6:>10.2f}us{change * 100:>+9.1f}%"
+
+            if change > args.tolerance:
+                regressions.append(name)
+                line += "  REGRESSION"
+
+        print(line)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump({**baseline, **results}, file, indent=2)
+
+        print(f"Saved the baseline to {args.baseline}")
+
+    elif regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
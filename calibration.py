@@ -0,0 +1,74 @@
+"""
+Tells when the player is holding a pose still, for the UP! and DOWN! calibration.
+
+The shoulder height is watched over the last hold_time seconds. Its mean and variance are kept up to date as samples
+come in and drop out of the window (Welford's method), so checking costs the same however fast the camera is. The pose
+counts as held once the window is full and the shoulders have wobbled less than max_wobble shoulder widths; measuring
+in shoulder widths makes that independent of how far the player is from the camera.
+"""
+
+from collections import deque
+from math import sqrt
+
+
+class PoseHold:
+    def __init__(self, hold_time=0.5, max_wobble=0.04):
+        self.hold_time = hold_time
+        self.max_wobble = max_wobble
+
+        self.samples = deque()  # (time, shoulder y)
+        self.start_time = None
+        self.mean = 0
+        self.m2 = 0  # The sum of the squared differences from the mean
+        self.shoulder_width = 0
+
+    def reset(self):
+        self.samples.clear()
+        self.start_time = None
+        self.mean = 0
+        self.m2 = 0
+        self.shoulder_width = 0
+
+    @property
+    def has_samples(self):
+        return bool(self.samples)
+
+    @property
+    def wobble(self):
+        """
+        The standard deviation of the shoulder height over the window, in shoulder widths.
+        """
+
+        if not self.samples or not self.shoulder_width:
+            return float("inf")
+
+        return sqrt(max(0, self.m2) / len(self.samples)) / self.shoulder_width  # m2 can drift just below 0
+
+    def add(self, time, body_parts):
+        """
+        Takes the landmarks of a frame (MovementAnalyser.body_parts). Returns True if the pose is being held.
+        """
+
+        if not body_parts:  # Losing the player breaks the hold
+            self.reset()
+            return False
+
+        left_shoulder, right_shoulder = body_parts[11], body_parts[12]
+        y = (left_shoulder[2] + right_shoulder[2]) / 2
+        self.shoulder_width = abs(left_shoulder[1] - right_shoulder[1])
+
+        if self.start_time is None:
+            self.start_time = time
+
+        self.samples.append((time, y))
+        delta = y - self.mean
+        self.mean += delta / len(self.samples)
+        self.m2 += delta * (y - self.mean)
+
+        while self.samples[0][0] < time - self.hold_time:
+            _, old_y = self.samples.popleft()
+            old_mean = self.mean
+            self.mean -= (old_y - self.mean) / len(self.samples)
+            self.m2 -= (old_y - old_mean) * (old_y - self.mean)
+
+        return time - self.start_time >= self.hold_time and self.wobble <= self.max_wobble
@@ -1,55 +1,554 @@
-from os import mkdir, getcwd, access, R_OK
+from os import mkdir, getcwd, access, R_OK, getpid, environ
 from os.path import join as os_join
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from threading import Lock
+from time import sleep
+import random
 import sqlite3
+from uuid import uuid4
 
 db_dir = getcwd()
+DB_PATH = environ.get("MUSCLE_SURVIVORS_DB", os_join(db_dir, "game.db"))
 
-connection = sqlite3.connect(os_join(db_dir, "game.db"))
-connection.execute("PRAGMA foreign_keys = 1;")
-cursor = connection.cursor()
+# Every query below is a constant string with "?" parameters, so sqlite3 prepares each one once per connection and
+# reuses it from the connection's statement cache afterwards.
+STATEMENT_CACHE_SIZE = 128
 
+# Several game processes can share one game.db. SQLite itself waits up to BUSY_TIMEOUT seconds for a lock, after that
+# the whole operation is retried with an exponentially growing (and jittered) delay.
+BUSY_TIMEOUT = 2
+MAX_ATTEMPTS = 8
+RETRY_DELAY = 0.01
 
-def run(sql):
-    cursor.execute(sql)
-    connection.commit()
-    return list(cursor)
+# The leaderboard table holds the best LEADERBOARD_SIZE scores of each difficulty. Triggers on scores keep it up to
+# date, so reading a leaderboard costs the same however long the score history gets. Ties go to the earlier score.
+# The triggers are created with this value, so after changing it drop them and run the migration again.
+LEADERBOARD_SIZE = 10
+
+FILL_LEADERBOARD = f"""
+    INSERT INTO leaderboard (scoreId, playerName, difficulty, score)
+    SELECT scoreId, playerName, difficulty, score FROM (
+        SELECT rowid AS scoreId, playerName, difficulty, score,
+               ROW_NUMBER() OVER (PARTITION BY difficulty ORDER BY score DESC, rowid) AS place
+        FROM scores)
+    WHERE place <= {LEADERBOARD_SIZE};"""
+
+# Created by enable_score_sync and dropped by disable_score_sync, so only kiosks that sync keep a copy of every new
+# score until it has been sent
+SYNC_OUTBOX_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS syncOutboxAfterInsert AFTER INSERT ON scores
+    BEGIN
+        INSERT INTO syncOutbox (playerName, difficulty, score, playedAt)
+        VALUES (NEW.playerName, NEW.difficulty, NEW.score, NEW.playedAt);
+    END;"""
+
+# Each migration brings the schema up by one version (PRAGMA user_version), so an existing game.db is upgraded in place.
+MIGRATIONS = [
+    # 1: Lets the leaderboards read the top scores straight off an index instead of sorting the whole table
+    ("CREATE INDEX IF NOT EXISTS scoresDifficultyScore ON scores (difficulty, score DESC);",),
+    # 2: The materialised leaderboard
+    ("CREATE TABLE IF NOT EXISTS leaderboard (scoreId INTEGER PRIMARY KEY, playerName TEXT, difficulty TEXT, score INTEGER);",
+     "CREATE INDEX IF NOT EXISTS leaderboardDifficultyScore ON leaderboard (difficulty, score DESC, scoreId);",
+     f"""CREATE TRIGGER IF NOT EXISTS leaderboardAfterInsert AFTER INSERT ON scores
+         BEGIN
+             INSERT INTO leaderboard (scoreId, playerName, difficulty, score)
+             SELECT NEW.rowid, NEW.playerName, NEW.difficulty, NEW.score
+             WHERE (SELECT COUNT(*) FROM leaderboard WHERE difficulty = NEW.difficulty) < {LEADERBOARD_SIZE}
+                OR NEW.score > (SELECT MIN(score) FROM leaderboard WHERE difficulty = NEW.difficulty);
+
+             DELETE FROM leaderboard WHERE scoreId IN (
+                 SELECT scoreId FROM leaderboard WHERE difficulty = NEW.difficulty
+                 ORDER BY score DESC, scoreId LIMIT -1 OFFSET {LEADERBOARD_SIZE});
+         END;""",
+     """CREATE TRIGGER IF NOT EXISTS leaderboardAfterDelete AFTER DELETE ON scores
+         WHEN EXISTS (SELECT 1 FROM leaderboard WHERE scoreId = OLD.rowid)
+         BEGIN
+             DELETE FROM leaderboard WHERE scoreId = OLD.rowid;
+
+             INSERT INTO leaderboard (scoreId, playerName, difficulty, score)
+             SELECT rowid, playerName, difficulty, score FROM scores
+             WHERE difficulty = OLD.difficulty
+               AND rowid NOT IN (SELECT scoreId FROM leaderboard WHERE difficulty = OLD.difficulty)
+             ORDER BY score DESC, rowid LIMIT 1;
+         END;""",
+     "DELETE FROM leaderboard;",
+     FILL_LEADERBOARD),
+    # 3: When each score was set, indexes for the per-player queries and a histogram of the scores per difficulty for
+    # percentile ranks (the scores are whole seconds, so it stays a few hundred rows long)
+    ("ALTER TABLE scores ADD COLUMN playedAt INTEGER;",
+     "CREATE INDEX IF NOT EXISTS scoresPlayerDifficultyScore ON scores (playerName, difficulty, score DESC);",
+     "CREATE INDEX IF NOT EXISTS scoresPlayer ON scores (playerName);",
+     "CREATE TABLE IF NOT EXISTS scoreHistogram (difficulty TEXT, score INTEGER, count INTEGER, PRIMARY KEY (difficulty, score)) WITHOUT ROWID;",
+     """CREATE TRIGGER IF NOT EXISTS scoreHistogramAfterInsert AFTER INSERT ON scores
+         BEGIN
+             INSERT INTO scoreHistogram (difficulty, score, count) VALUES (NEW.difficulty, NEW.score, 1)
+             ON CONFLICT (difficulty, score) DO UPDATE SET count = count + 1;
+         END;""",
+     """CREATE TRIGGER IF NOT EXISTS scoreHistogramAfterDelete AFTER DELETE ON scores
+         BEGIN
+             UPDATE scoreHistogram SET count = count - 1 WHERE difficulty = OLD.difficulty AND score = OLD.score;
+             DELETE FROM scoreHistogram WHERE difficulty = OLD.difficulty AND score = OLD.score AND count <= 0;
+         END;""",
+     "DELETE FROM scoreHistogram;",
+     "INSERT INTO scoreHistogram (difficulty, score, count) SELECT difficulty, score, COUNT(*) FROM scores GROUP BY difficulty, score;"),
+    # 4: Syncing with the shared leaderboard service (score_sync.py). The outbox holds the scores that haven't been
+    # sent yet; AUTOINCREMENT keeps its ids from ever being reused, so the service can dedupe on them.
+    ("CREATE TABLE IF NOT EXISTS syncState (key TEXT PRIMARY KEY, value TEXT);",
+     "CREATE TABLE IF NOT EXISTS syncOutbox (id INTEGER PRIMARY KEY AUTOINCREMENT, playerName TEXT, difficulty TEXT, score INTEGER, playedAt INTEGER);",
+     "CREATE TABLE IF NOT EXISTS remoteLeaderboard (difficulty TEXT, place INTEGER, playerName TEXT, score INTEGER, PRIMARY KEY (difficulty, place)) WITHOUT ROWID;"),
+    # 5: One row per run with its reps (rep_counter.py), the rep times and the downsampled signal packed into BLOBs. The
+    # index covers every column but the BLOBs, so the history queries are answered from the index without reading a
+    # single row of the table.
+    ("CREATE TABLE IF NOT EXISTS workouts (id INTEGER PRIMARY KEY, playerName TEXT REFERENCES accounts(playerName), difficulty TEXT, "
+     "playedAt INTEGER, duration REAL, nReps INTEGER, signalRate INTEGER, repTimes BLOB, signal BLOB);",
+     "CREATE INDEX IF NOT EXISTS workoutsPlayerPlayedAt ON workouts (playerName, playedAt, difficulty, duration, nReps);"),
+    # 6: The frames of analysed workout videos (video_analysis.py). The shoulders are NULL where the body wasn't found.
+    ("CREATE TABLE IF NOT EXISTS videoFrames (video TEXT, frameN INTEGER, time REAL, leftShoulderX INTEGER, leftShoulderY INTEGER, "
+     "rightShoulderX INTEGER, rightShoulderY INTEGER, percentage REAL, nReps INTEGER, PRIMARY KEY (video, frameN)) WITHOUT ROWID;",),
+]
+
+
+def connect(path=DB_PATH):
+    # Connections are handed between threads by the pool, but only ever used by one thread at a time
+    new_connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE,
+                                     check_same_thread=False)
+    new_connection.execute("PRAGMA foreign_keys = 1;")
+    # Only takes on a new database, and only before WAL mode is set. Lets db_maintenance.py free pages a few at a time.
+    new_connection.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    new_connection.execute("PRAGMA journal_mode = WAL;")
+    new_connection.execute("PRAGMA synchronous = NORMAL;")  # Still safe against corruption in WAL mode
+
+    return new_connection
+
+
+class ConnectionPool:
+    """
+    Keeps up to max_size idle connections to one database for the threads of this process. SQLite connections must
+    never cross a fork, so a pool that finds itself in a new process forgets the connections it inherited.
+    """
+
+    def __init__(self, path, max_size=4):
+        self.path = path
+        self.max_size = max_size
+
+        self.lock = Lock()
+        self.pid = getpid()
+        self.idle = []
+
+    def acquire(self):
+        with self.lock:
+            if self.pid != getpid():
+                self.pid = getpid()
+                self.idle = []  # Not closed, closing them here could release the parent's locks
+
+            if self.idle:
+                return self.idle.pop()
+
+        return connect(self.path)
+
+    def release(self, db_connection):
+        if db_connection.in_transaction:
+            db_connection.rollback()
+
+        with self.lock:
+            if self.pid == getpid() and len(self.idle) < self.max_size:
+                self.idle.append(db_connection)
+                return
+
+        db_connection.close()
+
+    @contextmanager
+    def connection(self):
+        db_connection = self.acquire()
+
+        try:
+            yield db_connection
+        finally:
+            self.release(db_connection)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+
+        for db_connection in idle:
+            db_connection.close()
+
+
+def is_busy(error):
+    if hasattr(error, "sqlite_errorcode"):
+        return error.sqlite_errorcode & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def retry_on_busy(function):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        delay = RETRY_DELAY
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                return function(*args, **kwargs)
+            except sqlite3.OperationalError as error:
+                if attempt == MAX_ATTEMPTS or not is_busy(error):
+                    raise
+
+            sleep(delay * random.uniform(0.5, 1.5))
+            delay *= 2
+
+    return wrapper
+
+
+@contextmanager
+def write_transaction(db_connection):
+    """
+    Takes the write lock up front (BEGIN IMMEDIATE), so a busy database fails here, where retrying is safe, instead of
+    halfway through the transaction. Keep the work inside short: every other writer waits for it.
+    """
+
+    db_connection.execute("BEGIN IMMEDIATE;")
+
+    try:
+        yield db_connection
+        db_connection.commit()
+    except BaseException:
+        db_connection.rollback()
+        raise
+
+
+@retry_on_busy
+def create_tables(db_connection):
+    with write_transaction(db_connection):
+        db_connection.execute("CREATE TABLE IF NOT EXISTS accounts (playerName TEXT PRIMARY KEY, playerPassword TEXT);")
+        db_connection.execute("CREATE TABLE IF NOT EXISTS scores (playerName REFERENCES accounts(playerName), difficulty TEXT, score INTEGER);")
+
+
+@retry_on_busy
+def migrate(db_connection):
+    while True:
+        # The version is read inside the write transaction, so two processes starting together can't both migrate
+        with write_transaction(db_connection):
+            version = db_connection.execute("PRAGMA user_version;").fetchone()[0]
+
+            if version >= len(MIGRATIONS):
+                return
+
+            for statement in MIGRATIONS[version]:
+                db_connection.execute(statement)
+
+            db_connection.execute(f"PRAGMA user_version = {version + 1};")
+
+
+def open_database(path=DB_PATH):
+    """
+    Opens (and if needed creates or upgrades) the database at path and makes it the one this module works on.
+    """
+
+    global pool, db_path
+
+    if pool is not None:
+        pool.close()
+
+    db_path = path
+    pool = ConnectionPool(path)
+
+    with pool.connection() as db_connection:
+        create_tables(db_connection)
+        migrate(db_connection)
+
+    return pool
+
+
+@retry_on_busy
+def query(sql, parameters=()):
+    """
+    For reads. Nothing is committed.
+    """
+
+    with pool.connection() as db_connection:
+        return db_connection.execute(sql, parameters).fetchall()
+
+
+def iterate(sql, parameters=(), batch_size=1000):
+    """
+    For reads too big to hold in memory. Yields the rows batch_size at a time off the cursor.
+    """
+
+    with pool.connection() as db_connection:
+        cursor = db_connection.execute(sql, parameters)
+
+        while batch := cursor.fetchmany(batch_size):
+            yield from batch
+
+
+@retry_on_busy
+def execute(sql, parameters=()):
+    """
+    For writes. The statement runs in its own short transaction.
+    """
+
+    with pool.connection() as db_connection, write_transaction(db_connection):
+        db_connection.execute(sql, parameters)
 
 
 def insert_score(player_name, difficulty, score):
-    run(f"INSERT INTO scores (playerName, difficulty, score) VALUES ('{player_name}', '{difficulty}', {score});")
+    execute("INSERT INTO scores (playerName, difficulty, score, playedAt) VALUES (?, ?, ?, unixepoch());",
+            (player_name, difficulty, score))
+
+
+@retry_on_busy
+def insert_scores(rows, db_connection=None):
+    """
+    Inserts (playerName, difficulty, score) rows in a single transaction.
+    """
+
+    with nullcontext(db_connection) if db_connection else pool.connection() as db_connection, \
+            write_transaction(db_connection):
+        db_connection.executemany("INSERT INTO scores (playerName, difficulty, score, playedAt) VALUES (?, ?, ?, unixepoch());",
+                                  rows)
+
+
+def insert_workout(player_name, difficulty, duration, n_reps, signal_rate, rep_times, signal):
+    insert_workouts(((player_name, difficulty, duration, n_reps, signal_rate, rep_times, signal),))
+
+
+@retry_on_busy
+def insert_workouts(rows, db_connection=None):
+    """
+    Inserts (playerName, difficulty, duration, nReps, signalRate, repTimes, signal) rows in a single transaction.
+    """
+
+    with nullcontext(db_connection) if db_connection else pool.connection() as db_connection, \
+            write_transaction(db_connection):
+        db_connection.executemany("INSERT INTO workouts (playerName, difficulty, playedAt, duration, nReps, signalRate, repTimes, signal) "
+                                  "VALUES (?, ?, unixepoch(), ?, ?, ?, ?, ?);", rows)
+
+
+@retry_on_busy
+def insert_video_frames(rows):
+    """
+    Inserts (video, frameN, time, leftShoulderX, leftShoulderY, rightShoulderX, rightShoulderY, percentage, nReps) rows
+    in a single transaction. A video that's analysed again replaces its old frames.
+    """
+
+    with pool.connection() as db_connection, write_transaction(db_connection):
+        db_connection.executemany("INSERT OR REPLACE INTO videoFrames (video, frameN, time, leftShoulderX, leftShoulderY, "
+                                  "rightShoulderX, rightShoulderY, percentage, nReps) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);",
+                                  rows)
 
 
 def insert_player(player_name, player_password):
-    existing = run(f"SELECT playerPassword FROM accounts WHERE playerName = '{player_name}'")
+    existing = query("SELECT playerPassword FROM accounts WHERE playerName = ?;", (player_name,))
     if existing:
         if existing[0][0] == player_password:
             return True
         return False
 
-    run(f"INSERT INTO accounts (playerName, playerPassword) VALUES ('{player_name}', '{player_password}');")
+    try:
+        execute("INSERT INTO accounts (playerName, playerPassword) VALUES (?, ?);", (player_name, player_password))
+    except sqlite3.IntegrityError:  # Another process signed the same name up in between
+        return insert_player(player_name, player_password)
 
     return True
 
 
 def clear_accounts_table():
-    run(f"DELETE FROM accounts")
+    execute("DELETE FROM accounts;")
 
 
 def clear_scores_table():
-    run(f"DELETE FROM scores")
+    execute("DELETE FROM scores;")
 
 
 def get_high_scores(difficulty, n):
-    return run(f"SELECT playerName, score FROM scores WHERE difficulty = '{difficulty}' ORDER BY score DESC LIMIT {n}")
+    if n <= LEADERBOARD_SIZE:
+        return query("SELECT playerName, score FROM leaderboard WHERE difficulty = ? ORDER BY score DESC, scoreId LIMIT ?;",
+                      (difficulty, n))
+
+    return query("SELECT playerName, score FROM scores WHERE difficulty = ? ORDER BY score DESC, rowid LIMIT ?;",
+                 (difficulty, n))
+
+
+@retry_on_busy
+def rebuild_leaderboard():
+    """
+    Refills the leaderboard table from the whole score history.
+    """
+
+    with pool.connection() as db_connection, write_transaction(db_connection):
+        db_connection.execute("DELETE FROM leaderboard;")
+        db_connection.execute(FILL_LEADERBOARD)
+
+
+def get_personal_best(player_name, difficulty):
+    """
+    Returns None if the player has no score on that difficulty.
+    """
+
+    return query("SELECT MAX(score) FROM scores WHERE playerName = ? AND difficulty = ?;", (player_name, difficulty))[0][0]
+
+
+def get_recent_runs(player_name, n=10):
+    """
+    Returns the player's last n runs, newest first, as (difficulty, score, playedAt) rows. playedAt is in Unix time
+    and None for scores saved before it was recorded.
+    """
+
+    return query("SELECT difficulty, score, playedAt FROM scores WHERE playerName = ? ORDER BY rowid DESC LIMIT ?;",
+                 (player_name, n))
+
+
+def get_rank(difficulty, score):
+    """
+    Returns the place the score takes among the stored scores of the difficulty (1 is the best) and how many scores
+    are stored.
+    """
+
+    n_better, n_scores = query("SELECT COALESCE(SUM(CASE WHEN score > ? THEN count END), 0), COALESCE(SUM(count), 0) "
+                               "FROM scoreHistogram WHERE difficulty = ?;", (score, difficulty))[0]
+
+    return n_better + 1, n_scores
+
+
+def get_top_percentage(difficulty, score, is_stored=True):
+    """
+    Where the score ranks, as in "top 3%". Pass is_stored=False for a score that hasn't been written yet.
+    """
+
+    rank, n_scores = get_rank(difficulty, score)
+
+    return 100 * rank / max(1, n_scores + (not is_stored))
+
+
+def get_workout_history(player_name, n=10):
+    """
+    Returns the player's last n workouts, newest first, as (id, difficulty, playedAt, duration, nReps) rows.
+    """
+
+    return query("SELECT id, difficulty, playedAt, duration, nReps FROM workouts WHERE playerName = ? "
+                 "ORDER BY playedAt DESC LIMIT ?;", (player_name, n))
+
+
+def get_total_reps(player_name, since=0):
+    """
+    How many reps the player has done since the Unix time since.
+    """
+
+    return query("SELECT COALESCE(SUM(nReps), 0) FROM workouts WHERE playerName = ? AND playedAt >= ?;",
+                 (player_name, since))[0][0]
+
+
+def get_workout(workout_id):
+    """
+    Returns (playerName, difficulty, playedAt, duration, nReps, signalRate, repTimes, signal) or None. The BLOBs can be
+    unpacked with rep_counter.decode_rep_times and rep_counter.decode_signal.
+    """
+
+    rows = query("SELECT playerName, difficulty, playedAt, duration, nReps, signalRate, repTimes, signal FROM workouts "
+                 "WHERE id = ?;", (workout_id,))
+
+    return rows[0] if rows else None
+
+
+@retry_on_busy
+def enable_score_sync():
+    """
+    Starts queueing new scores in the sync outbox. Every score stored while it wasn't queueing (all of them, the first
+    time) is queued as well. Returns this database's kiosk id, which is made up once and kept in syncState.
+    """
+
+    with pool.connection() as db_connection, write_transaction(db_connection):
+        if not db_connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'syncOutboxAfterInsert';").fetchone():
+            db_connection.execute(SYNC_OUTBOX_TRIGGER)
+            db_connection.execute("INSERT INTO syncOutbox (playerName, difficulty, score, playedAt) "
+                                  "SELECT playerName, difficulty, score, playedAt FROM scores "
+                                  "WHERE rowid > IFNULL((SELECT CAST(value AS INTEGER) FROM syncState WHERE key = 'queuedUpTo'), 0) "
+                                  "ORDER BY rowid;")
+
+        db_connection.execute("INSERT OR IGNORE INTO syncState (key, value) VALUES ('kioskId', ?);", (uuid4().hex,))
+        return db_connection.execute("SELECT value FROM syncState WHERE key = 'kioskId';").fetchone()[0]
+
+
+@retry_on_busy
+def disable_score_sync():
+    """
+    Stops queueing new scores in the sync outbox, so it doesn't grow forever on a kiosk that no longer syncs. The scores
+    already queued stay there until enable_score_sync.
+    """
+
+    with pool.connection() as db_connection, write_transaction(db_connection):
+        if db_connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'syncOutboxAfterInsert';").fetchone():
+            db_connection.execute("DROP TRIGGER syncOutboxAfterInsert;")
+            db_connection.execute("INSERT OR REPLACE INTO syncState (key, value) "
+                                  "VALUES ('queuedUpTo', (SELECT IFNULL(MAX(rowid), 0) FROM scores));")
+
+
+def get_unsynced_scores(n):
+    """
+    Returns the oldest n scores of the sync outbox as (id, playerName, difficulty, score, playedAt) rows.
+    """
+
+    return query("SELECT id, playerName, difficulty, score, playedAt FROM syncOutbox ORDER BY id LIMIT ?;", (n,))
+
+
+def mark_scores_synced(last_id):
+    execute("DELETE FROM syncOutbox WHERE id <= ?;", (last_id,))
+
+
+@retry_on_busy
+def set_remote_leaderboards(leaderboards):
+    """
+    Replaces the cached leaderboards of the service with leaderboards, {difficulty: [(playerName, score), ...]}.
+    Returns whether anything changed.
+    """
+
+    rows = [(difficulty, place, player_name, score)
+            for difficulty, scores in leaderboards.items() for place, (player_name, score) in enumerate(scores)]
+
+    with pool.connection() as db_connection, write_transaction(db_connection):
+        if db_connection.execute("SELECT * FROM remoteLeaderboard ORDER BY difficulty, place;").fetchall() == sorted(rows):
+            return False
+
+        db_connection.execute("DELETE FROM remoteLeaderboard;")
+        db_connection.executemany("INSERT INTO remoteLeaderboard (difficulty, place, playerName, score) VALUES (?, ?, ?, ?);",
+                                  rows)
+
+    return True
+
+
+def get_shared_high_scores(difficulty, n):
+    """
+    Like get_high_scores, but over every kiosk: the service's cached leaderboard plus the scores it hasn't been sent
+    yet, so a kiosk that's offline still shows its own new scores.
+    """
+
+    return query("SELECT playerName, score FROM ("
+                 "    SELECT playerName, score, 0 AS source, place AS n FROM remoteLeaderboard WHERE difficulty = ?"
+                 "    UNION ALL"
+                 "    SELECT playerName, score, 1 AS source, id AS n FROM syncOutbox WHERE difficulty = ?) "
+                 "ORDER BY score DESC, source, n LIMIT ?;", (difficulty, difficulty, n))
 
 
 def get_all_scores():
-    return run("SELECT * FROM scores")
+    return query("SELECT * FROM scores;")
 
 
 def get_all_accounts():
-    return run("SELECT * FROM accounts")
+    return query("SELECT * FROM accounts;")
+
+
+pool = None
+db_path = DB_PATH
+open_database()
+
+if __name__ == "__main__":
+    import argparse
 
+    parser = argparse.ArgumentParser(description="Maintenance commands for the game's database.")
+    parser.add_argument("command", choices=["rebuild-leaderboard"])
+    args = parser.parse_args()
 
-run("CREATE TABLE IF NOT EXISTS accounts (playerName TEXT PRIMARY KEY, playerPassword TEXT);")
-run("CREATE TABLE IF NOT EXISTS scores (playerName REFERENCES accounts(playerName), difficulty TEXT, score INTEGER);")
+    if args.command == "rebuild-leaderboard":
+        rebuild_leaderboard()
+        print(f"Rebuilt the leaderboard of {db_path}")
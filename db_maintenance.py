@@ -0,0 +1,321 @@
+"""
+Keeps game.db small and its queries fast over months of kiosk use.
+
+archive_scores moves the scores of every month older than keep_months out of the live database, into one gzipped SQLite
+database per month in the archive directory (scores-2025-03.db.gz, and scores-undated.db.gz for the scores saved before
+playedAt was recorded). It never moves the best keep_top scores of a difficulty, so the leaderboards (and
+get_high_scores up to keep_top places) don't change, or a player's best on a difficulty, so personal bests don't
+either. The archived scores are added back to scoreHistogram, so percentile ranks are still over every score ever
+played. The scores are deleted a few hundred at a time, each batch in its own short transaction, so a game writing a
+score never waits long. The sync outbox holds its own copies of the scores, so archiving doesn't lose unsent ones.
+
+Deleting only leaves free pages inside the file. With auto_vacuum = INCREMENTAL they can be handed back to the file
+system a few at a time: IdleMaintenance does that (and the archiving) on a background thread while nobody is playing.
+New databases are made that way (see database.connect); an older one has to be switched over with one full VACUUM,
+which the vacuum command does. A full VACUUM can renumber the rowids of scores, so it rebuilds the leaderboard after.
+
+Usage:
+    python db_maintenance.py report
+    python db_maintenance.py archive --keep-months 6 --keep-top 100
+    python db_maintenance.py vacuum
+"""
+
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+from collections import Counter
+from os.path import join as path_join, exists, getsize
+from statistics import median
+from threading import Thread, Event
+from time import perf_counter, time
+import database
+
+ARCHIVE_DIR = "Archive"
+DELETE_BATCH_SIZE = 500
+ARCHIVE_INTERVAL = 24 * 60 * 60  # How often IdleMaintenance archives, in seconds
+ARCHIVE_RETRY_DELAY = 60  # How soon IdleMaintenance tries again after archiving failed, e.g. on a locked database
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+@database.retry_on_busy
+def delete_archived_scores(db_connection, rows):
+    """
+    Deletes (scoreId, difficulty, score) rows from scores. The delete trigger takes them off scoreHistogram, so they're
+    counted back in.
+    """
+
+    with database.write_transaction(db_connection):
+        db_connection.executemany("DELETE FROM scores WHERE rowid = ?;", [(row[0],) for row in rows])
+        db_connection.executemany("INSERT INTO scoreHistogram (difficulty, score, count) VALUES (?, ?, ?) "
+                                  "ON CONFLICT (difficulty, score) DO UPDATE SET count = count + excluded.count;",
+                                  [(*key, count) for key, count in Counter(row[1:] for row in rows).items()])
+
+
+def write_archive(path, rows):
+    """
+    Adds (scoreId, playerName, difficulty, score, playedAt) rows to the gzipped archive at path. A score that's already
+    in it is skipped, so archiving a month again after a crash doesn't duplicate it.
+    """
+
+    working_path = path[:-3]
+
+    # A working copy left behind by a crash has everything the .gz has and maybe more
+    if exists(path) and not exists(working_path):
+        with gzip.open(path, "rb") as archive, open(working_path + ".tmp", "wb") as working:
+            shutil.copyfileobj(archive, working)
+        os.replace(working_path + ".tmp", working_path)
+
+    archive_connection = sqlite3.connect(working_path)
+    try:
+        archive_connection.execute("CREATE TABLE IF NOT EXISTS scores (scoreId INTEGER PRIMARY KEY, playerName TEXT, "
+                                   "difficulty TEXT, score INTEGER, playedAt INTEGER);")
+        archive_connection.executemany("INSERT OR IGNORE INTO scores (scoreId, playerName, difficulty, score, playedAt) "
+                                       "VALUES (?, ?, ?, ?, ?);", rows)
+        archive_connection.commit()
+    finally:
+        archive_connection.close()
+
+    with open(working_path, "rb") as working, gzip.open(path + ".tmp", "wb") as archive:
+        shutil.copyfileobj(working, archive)
+    os.replace(path + ".tmp", path)
+    os.remove(working_path)
+
+
+def read_archive(path):
+    """
+    Returns the (scoreId, playerName, difficulty, score, playedAt) rows of a gzipped archive.
+    """
+
+    with gzip.open(path, "rb") as archive:
+        archive_connection = sqlite3.connect(":memory:")
+        archive_connection.deserialize(archive.read())
+
+    try:
+        return archive_connection.execute("SELECT * FROM scores ORDER BY scoreId;").fetchall()
+    finally:
+        archive_connection.close()
+
+
+def archive_scores(keep_months=6, keep_top=100, archive_dir=ARCHIVE_DIR, db_connection=None):
+    """
+    Archives the scores played before the start of the month keep_months ago. Returns the number of scores archived
+    for each month.
+    """
+
+    if keep_top < database.LEADERBOARD_SIZE:
+        raise ValueError(f"keep_top must be at least the leaderboard size ({database.LEADERBOARD_SIZE})")
+
+    owns_connection = db_connection is None
+    if owns_connection:
+        db_connection = database.connect(database.db_path)
+
+    try:
+        # Worked out once, up front. Scores written meanwhile are newer than the cutoff, and can only push a kept
+        # score out of the top, never the other way round, so the list stays safe to archive.
+        db_connection.execute("DROP TABLE IF EXISTS temp.archivedScores;")
+        db_connection.execute("""
+            CREATE TEMP TABLE archivedScores AS
+            SELECT scoreId, playerName, difficulty, score, playedAt,
+                   COALESCE(strftime('%Y-%m', playedAt, 'unixepoch'), 'undated') AS month
+            FROM (SELECT rowid AS scoreId, playerName, difficulty, score, playedAt,
+                         ROW_NUMBER() OVER (PARTITION BY difficulty ORDER BY score DESC, rowid) AS place,
+                         ROW_NUMBER() OVER (PARTITION BY playerName, difficulty ORDER BY score DESC, rowid) AS playerPlace
+                  FROM scores)
+            WHERE (playedAt IS NULL OR playedAt < unixepoch('now', 'start of month', ?))
+              AND place > ? AND playerPlace > 1;""", (f"-{keep_months} months", keep_top))
+
+        months = [row[0] for row in db_connection.execute("SELECT DISTINCT month FROM archivedScores ORDER BY month;")]
+        n_archived = {}
+
+        if months:
+            os.makedirs(archive_dir, exist_ok=True)
+
+        for month in months:
+            rows = db_connection.execute("SELECT scoreId, playerName, difficulty, score, playedAt FROM archivedScores "
+                                         "WHERE month = ? ORDER BY scoreId;", (month,)).fetchall()
+
+            # Written before anything is deleted, so a crash in between leaves a score in both places, never neither
+            write_archive(path_join(archive_dir, f"scores-{month}.db.gz"), rows)
+
+            for start in range(0, len(rows), DELETE_BATCH_SIZE):
+                delete_archived_scores(db_connection, [(row[0], row[2], row[3])
+                                                       for row in rows[start:start + DELETE_BATCH_SIZE]])
+
+            n_archived[month] = len(rows)
+
+        db_connection.execute("DROP TABLE temp.archivedScores;")
+
+        return n_archived
+    finally:
+        if owns_connection:
+            db_connection.close()
+
+
+def vacuum_step(db_connection, n_pages):
+    """
+    Hands up to n_pages free pages back to the file system. Returns how many are still free, 0 if the database isn't
+    in incremental auto-vacuum mode.
+    """
+
+    if db_connection.execute("PRAGMA auto_vacuum;").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        return 0
+
+    n_free = db_connection.execute("PRAGMA freelist_count;").fetchone()[0]
+    if n_free:
+        # execute() would only take the pragma's first step, which frees a single page
+        db_connection.executescript(f"PRAGMA incremental_vacuum({int(n_pages)});")
+        n_free = db_connection.execute("PRAGMA freelist_count;").fetchone()[0]
+
+    return n_free
+
+
+def vacuum(db_connection=None):
+    """
+    Frees every free page and shrinks the WAL. A database that isn't in incremental auto-vacuum mode yet is switched
+    over with a full VACUUM, which needs as much free disk space as the database takes and locks it until it's done.
+    """
+
+    owns_connection = db_connection is None
+    if owns_connection:
+        db_connection = database.connect(database.db_path)
+
+    try:
+        if db_connection.execute("PRAGMA auto_vacuum;").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            db_connection.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+            db_connection.execute("VACUUM;")
+            database.rebuild_leaderboard()
+        else:
+            db_connection.executescript("PRAGMA incremental_vacuum;")
+
+        db_connection.execute("PRAGMA wal_checkpoint(TRUNCATE);").fetchall()
+    finally:
+        if owns_connection:
+            db_connection.close()
+
+
+def get_report(n_runs=50):
+    """
+    Returns the database's size and the median latency of the main score queries, in milliseconds.
+    """
+
+    page_size = database.query("PRAGMA page_size;")[0][0]
+    n_pages = database.query("PRAGMA page_count;")[0][0]
+    n_free = database.query("PRAGMA freelist_count;")[0][0]
+    wal_path = database.db_path + "-wal"
+
+    report = {"file MB": (getsize(database.db_path) + (getsize(wal_path) if exists(wal_path) else 0)) / 1e6,
+              "used MB": (n_pages - n_free) * page_size / 1e6,
+              "free MB": n_free * page_size / 1e6,
+              "scores": database.query("SELECT COUNT(*) FROM scores;")[0][0]}
+
+    player_name = (database.query("SELECT playerName FROM scores ORDER BY rowid DESC LIMIT 1;") or [(None,)])[0][0]
+    queries = {"leaderboard": lambda: database.get_high_scores("EASY", 10),
+               "top 100": lambda: database.get_high_scores("EASY", 100),
+               "personal best": lambda: database.get_personal_best(player_name, "EASY"),
+               "recent runs": lambda: database.get_recent_runs(player_name),
+               "rank": lambda: database.get_top_percentage("EASY", 30)}
+
+    for name, run_query in queries.items():
+        latencies = []
+        for _ in range(n_runs):
+            start = perf_counter()
+            run_query()
+            latencies.append(perf_counter() - start)
+
+        report[f"{name} ms"] = median(latencies) * 1000
+
+    return report
+
+
+def print_reports(before, after=None):
+    for key, value in before.items():
+        if after is None:
+            print(f"{key:<20}{value:>12.3f}")
+        else:
+            print(f"{key:<20}{value:>12.3f} -> {after[key]:>12.3f}")
+
+
+class IdleMaintenance:
+    """
+    Archives the old scores once a day and frees a few pages every interval seconds, on a background thread with its
+    own connection, but only while is_idle() (which should be cheap) says nobody is playing.
+    """
+
+    def __init__(self, is_idle, keep_months=None, keep_top=100, archive_dir=ARCHIVE_DIR, pages_per_step=64,
+                 interval=1):
+        self.is_idle = is_idle
+        self.keep_months = keep_months  # None never archives
+        self.keep_top = keep_top
+        self.archive_dir = archive_dir
+        self.pages_per_step = pages_per_step
+        self.interval = interval
+
+        self.stop_event = Event()
+        self.thread = Thread(target=self.run, name="IdleMaintenance", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def run(self):
+        db_connection = database.connect(database.db_path)
+        next_archive_time = 0
+
+        while not self.stop_event.wait(self.interval):
+            if not self.is_idle():
+                continue
+
+            try:
+                if self.keep_months is not None and time() >= next_archive_time:
+                    next_archive_time = time() + ARCHIVE_RETRY_DELAY  # Until it has worked
+                    archive_scores(self.keep_months, self.keep_top, self.archive_dir, db_connection)
+                    next_archive_time = time() + ARCHIVE_INTERVAL
+                else:
+                    vacuum_step(db_connection, self.pages_per_step)
+            except sqlite3.OperationalError as error:
+                if not database.is_busy(error):  # A game writing a score just has to be waited out
+                    print(f"DATABASE MAINTENANCE FAILED! {error!r}")
+            except (sqlite3.Error, OSError) as error:
+                print(f"DATABASE MAINTENANCE FAILED! {error!r}")
+
+        db_connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archives old scores and compacts the game's database.")
+    parser.add_argument("command", choices=["report", "archive", "vacuum"])
+    parser.add_argument("--keep-months", type=int, default=6, help="Months of scores to keep besides the current one")
+    parser.add_argument("--keep-top", type=int, default=100, help="Best scores of each difficulty that are never archived")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    before = get_report()
+
+    if args.command == "report":
+        print_reports(before)
+        return
+
+    start = perf_counter()
+    if args.command == "archive":
+        try:
+            n_archived = archive_scores(args.keep_months, args.keep_top, args.archive_dir)
+        except ValueError as error:
+            parser.error(str(error))
+
+        for month, n_scores in n_archived.items():
+            print(f"Archived {n_scores} score(s) of {month}")
+    else:
+        vacuum()
+
+    print(f"Ran {args.command} on {database.db_path} in {perf_counter() - start:.1f}s")
+    print_reports(before, get_report())
+
+
+if __name__ == "__main__":
+    main()
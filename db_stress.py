@@ -0,0 +1,113 @@
+"""
+Stress test for several game processes sharing one score database.
+
+N writer processes each insert their scores one transaction at a time (like a kiosk at GAME OVER) while M reader
+processes keep loading the three leaderboards. At the end every writer's scores are counted, so a write that was
+lost to a "database is locked" error shows up as a lost score.
+
+Usage: python db_stress.py --writers 8 --readers 4 --scores 500 [--db some.db]
+
+--db has to name a file that doesn't exist yet, so the test can never touch a real game.db.
+"""
+
+import os
+import tempfile
+import argparse
+from multiprocessing import Process, Queue, Event
+from time import perf_counter
+
+
+def writer(writer_n, n_scores, results):
+    import database
+
+    player_name = f"WRITER{writer_n}"
+    database.insert_player(player_name, "password")
+
+    n_failed = 0
+    start = perf_counter()
+
+    for score in range(n_scores):
+        try:
+            database.insert_score(player_name, ("EASY", "NORMAL", "HARD")[score % 3], score)
+        except database.sqlite3.Error as error:
+            n_failed += 1
+            print(f"{player_name} COULDN'T SAVE {score}! {error}")
+
+    results.put(("WRITER", writer_n, perf_counter() - start, n_failed))
+
+
+def reader(reader_n, writers_done, results):
+    import database
+
+    n_reads = 0
+    n_failed = 0
+    start = perf_counter()
+
+    while not writers_done.is_set():
+        for difficulty in ("EASY", "NORMAL", "HARD"):
+            try:
+                database.get_high_scores(difficulty, 3)
+                n_reads += 1
+            except database.sqlite3.Error:
+                n_failed += 1
+
+    results.put(("READER", reader_n, perf_counter() - start, n_reads, n_failed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hammers one score database from several processes.")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--scores", type=int, default=500, help="Scores per writer")
+    parser.add_argument("--db", default=None,
+                        help="A new database file to create, defaults to one in a temporary directory")
+    args = parser.parse_args()
+
+    if args.db is not None and os.path.exists(args.db):
+        parser.error(f"{args.db} already exists, the stress test only runs on a new database")
+
+    # Has to be set before the database module is imported anywhere
+    os.environ["MUSCLE_SURVIVORS_DB"] = args.db or os.path.join(tempfile.mkdtemp(), "stress.db")
+    import database
+
+    results = Queue()
+    writers_done = Event()
+
+    writers = [Process(target=writer, args=(i, args.scores, results)) for i in range(args.writers)]
+    readers = [Process(target=reader, args=(i, writers_done, results)) for i in range(args.readers)]
+
+    start = perf_counter()
+    for process in readers + writers:
+        process.start()
+
+    writer_results = [results.get() for _ in writers]
+    elapsed = perf_counter() - start
+    writers_done.set()
+    reader_results = [results.get() for _ in readers]
+
+    for process in readers + writers:
+        process.join()
+
+    n_written = args.writers * args.scores
+    n_failed_writes = sum(result[3] for result in writer_results)
+    n_reads = sum(result[3] for result in reader_results)
+    n_failed_reads = sum(result[4] for result in reader_results)
+
+    n_lost = 0
+    for writer_n in range(args.writers):
+        stored = {score for (score,) in database.query("SELECT score FROM scores WHERE playerName = ?;", (f"WRITER{writer_n}",))}
+        n_lost += len(set(range(args.scores)) - stored)
+
+    print(f"Database: {database.db_path}")
+    print(f"{args.writers} writers: {n_written} scores in {elapsed:.2f}s ({n_written / elapsed:.0f} writes/s), "
+          f"{n_failed_writes} failed")
+    print(f"{args.readers} readers: {n_reads} leaderboard reads ({n_reads / elapsed:.0f} reads/s), "
+          f"{n_failed_reads} failed")
+    print(f"Lost scores: {n_lost}")
+
+    if n_lost or n_failed_writes:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
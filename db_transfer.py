@@ -0,0 +1,128 @@
+"""
+Streams the accounts and scores tables to and from CSV or JSON Lines files (gzipped if the name ends in .gz), in
+constant memory: exports walk the cursor and imports insert fixed-size chunks, each in its own short transaction.
+
+Usage:
+    python db_transfer.py export scores scores.csv.gz
+    python db_transfer.py import accounts accounts.jsonl
+Import accounts before scores, every score has to belong to an existing account.
+"""
+
+import argparse
+import csv
+import gzip
+import json
+from itertools import islice
+from time import perf_counter
+import database
+
+COLUMNS = {"accounts": ("playerName", "playerPassword"), "scores": ("playerName", "difficulty", "score", "playedAt")}
+
+# Accounts that already exist are kept as they are; scores have no key, so every imported score is added.
+# Files exported before scores had a playedAt column are still read, their scores get no playedAt.
+INSERTS = {"accounts": "INSERT OR IGNORE INTO accounts (playerName, playerPassword) VALUES (?, ?);",
+           "scores": "INSERT INTO scores (playerName, difficulty, score, playedAt) VALUES (?, ?, ?, ?);"}
+
+
+def get_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith(".jsonl"):
+        return "jsonl"
+
+    raise ValueError(f"Can't tell the format of {path}, use a .csv or .jsonl file (optionally .gz)")
+
+
+def open_file(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", newline="", encoding="utf-8")
+
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def export_table(table, path, batch_size=1000):
+    """
+    Writes every row of the table to path. Returns the number of rows written.
+    """
+
+    columns = COLUMNS[table]
+    file_format = get_format(path)
+    rows = database.iterate(f"SELECT {', '.join(columns)} FROM {table};", batch_size=batch_size)
+    n_rows = 0
+
+    with open_file(path, "w") as file:
+        if file_format == "csv":
+            writer = csv.writer(file)
+            writer.writerow(columns)
+
+            for row in rows:
+                writer.writerow(row)
+                n_rows += 1
+        else:
+            for row in rows:
+                file.write(json.dumps(dict(zip(columns, row))) + "\n")
+                n_rows += 1
+
+    return n_rows
+
+
+def read_rows(table, file, file_format):
+    columns = COLUMNS[table]
+
+    if file_format == "csv":
+        for record in csv.DictReader(file):
+            yield tuple(record.get(column) or None for column in columns)
+    else:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                yield tuple(record.get(column) for column in columns)
+
+
+def import_table(table, path, chunk_size=10000):
+    """
+    Inserts the rows of path into the table, chunk_size rows per transaction. Returns the number of rows read.
+    """
+
+    file_format = get_format(path)
+    n_rows = 0
+
+    with open_file(path, "r") as file:
+        rows = read_rows(table, file, file_format)
+
+        while chunk := list(islice(rows, chunk_size)):
+            insert_chunk(table, chunk)
+            n_rows += len(chunk)
+
+    return n_rows
+
+
+@database.retry_on_busy
+def insert_chunk(table, rows):
+    with database.pool.connection() as db_connection, database.write_transaction(db_connection):
+        db_connection.executemany(INSERTS[table], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streams the accounts and scores tables to and from files.")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("table", choices=list(COLUMNS))
+    parser.add_argument("path", help="A .csv or .jsonl file, optionally gzipped (.csv.gz, .jsonl.gz)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows per transaction when importing")
+    args = parser.parse_args()
+
+    start = perf_counter()
+
+    if args.command == "export":
+        n_rows = export_table(args.table, args.path)
+    else:
+        n_rows = import_table(args.table, args.path, args.chunk_size)
+
+    elapsed = perf_counter() - start
+    print(f"{args.command.capitalize()}ed {n_rows} {args.table} rows in {elapsed:.2f}s ({n_rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,19 @@
 import pygame
 import random
+from math import ceil
 import database
 from movement_analyser import MovementAnalyser
 import UI
+import session_recorder
+import video_recorder
+from rep_counter import RepCounter
+from calibration import PoseHold
 from miscellaneous import Timer
 import settings
+from profiler import profiler
+from assets import assets
 from os.path import join as path_join
+from time import perf_counter
 
 
 class Player:
@@ -14,9 +22,12 @@ class Player:
         self.size = size
         self.pos = pos
         self.movement = pygame.Vector2(0, 0)
+        self.draw_pos = pygame.Vector2(0, 0)  # Reused by draw()
 
-    def draw(self, screen):
-        pygame.draw.circle(screen, self.color, self.pos, self.size)
+    def draw(self, screen, scale=1):
+        self.draw_pos.update(self.pos)
+        self.draw_pos *= scale
+        pygame.draw.circle(screen, self.color, self.draw_pos, self.size * scale)
 
 
 class Tile:
@@ -25,14 +36,21 @@ class Tile:
         self.color = color
 
 
-class GameMode1:
+class GameRules:
+    """
+    The obstacle, collision and movement rules of GameMode1. Nothing in here touches the display, the audio or
+    the camera, so the rules can also be stepped by the headless engine.
+    """
+
     MOVEMENT_SPEED = 10
+    SCREEN_SLIDING_SPEED = 5
+    SPAWN_AMOUNTS = {"EASY": 0.1, "NORMAL": 0.25, "HARD": 0.4}
 
-    def __init__(self, grid, difficulty="EASY"):
+    def __init__(self, grid, movement_analyser, difficulty="EASY", rng=random):
         self.obstacles = []
         self.obstacle_summoned = []
 
-        self.player = Player("#75a743", grid.tile_height / 2 * 0.6, (125, settings.WINDOW_SIZE[1]//2))
+        self.player = Player("#75a743", grid.tile_height / 2 * 0.6, (125, grid.size[1]//2))
 
         self.grid = grid
 
@@ -40,69 +58,238 @@ class GameMode1:
         self.difficulty = difficulty
         self.setup_difficulty()
 
-        self.movement_analyser = MovementAnalyser()
+        self.movement_analyser = movement_analyser
+        self.movement_percentage = 0
+        self.rng = rng
+
+        self.last_checked_frame_n = 0
+        self.update_movement_every_n_frames = 3
+
+    def set_difficulty(self, difficulty):
+        self.difficulty = difficulty
+        self.setup_difficulty()
+
+    def setup_difficulty(self):
+        self.spawn_amount = self.SPAWN_AMOUNTS[self.difficulty.upper()]
+
+    def step(self):
+        """
+        Runs the rules for one frame. Returns True if the player has hit an obstacle.
+        """
+
+        with profiler.stage("check_collisions"):
+            has_collided = self.check_collisions()
+
+        if has_collided:
+            return True
+
+        self.generate_obstacles(self.generate_obstacle_positions(self.grid.convert_local_coordinates_to_pos(self.player.pos)))
+        self.clear_obstacles()
+
+        return False
+
+    def generate_obstacle_positions(self, pos):
+        """
+        Returns None if the column in front of the player already has its obstacles. The random numbers are drawn
+        either way, so a run with the same seed makes the same obstacles.
+        """
+
+        line_n_tiles_y = self.grid.line_height // self.grid.tile_height
+        line_n_tiles_x = self.grid.line_width // self.grid.tile_width
+
+        column = pos[0] + line_n_tiles_x
+        min_y, max_y = pos[1] - round(line_n_tiles_y*3), pos[1] + round(line_n_tiles_y*3)
+        n_obstacles = self.rng.randint(1, int((self.grid.max_y-self.grid.min_y) * self.spawn_amount // self.grid.tile_height))
+
+        if column in self.obstacle_summoned:
+            for _ in range(n_obstacles):
+                self.rng.randint(min_y, max_y)
+
+            return None
+
+        return [(column, self.rng.randint(min_y, max_y)) for _ in range(n_obstacles)]
+
+    def generate_obstacles(self, positions):
+        if positions is None or positions[0][0] in self.obstacle_summoned:
+            return
+
+        for position in positions:
+            for obstacle in self.obstacles:
+                if position == obstacle.pos:
+                    break
+            else:
+                self.obstacles.append(Tile(position, (230, 10, 20)))
+
+        # A column only leaves this list when one of its obstacles is cleared, so a column that got no new obstacles
+        # would stay for the whole run. The spawn column only ever moves right (the list is sorted), and the columns
+        # left of it are never checked again.
+        if self.obstacle_summoned and self.obstacle_summoned[0] < positions[0][0]:
+            self.obstacle_summoned[:] = [column for column in self.obstacle_summoned if column >= positions[0][0]]
+
+        self.obstacle_summoned.append(positions[0][0])
+
+    def clear_obstacles(self):
+        line_n_tiles_x = self.grid.line_width // self.grid.tile_width
+        line_n_tiles_y = self.grid.line_height // self.grid.tile_height
+
+        player_pos = self.grid.convert_local_coordinates_to_pos(self.player.pos)
+        min_x, max_x = player_pos[0] - round(line_n_tiles_x * 3), player_pos[0] + round(line_n_tiles_x * 3)
+        min_y, max_y = player_pos[1] - round(line_n_tiles_y * 3), player_pos[1] + round(line_n_tiles_y * 3)
+
+        # Compacts the list in place, keeping the order, instead of copying it and removing one by one
+        n_kept = 0
+        for obstacle in self.obstacles:
+            if min_x <= obstacle.pos[0] <= max_x and min_y <= obstacle.pos[1] <= max_y:
+                self.obstacles[n_kept] = obstacle
+                n_kept += 1
+                continue
+
+            try:
+                self.obstacle_summoned.remove(obstacle.pos[0])
+            except ValueError:
+                pass
+
+        del self.obstacles[n_kept:]
+
+    def check_collisions(self):
+        player_x, player_y = self.player.pos
+        size = self.player.size
+
+        for obstacle in self.obstacles:
+            # Same as grid.convert_pos_to_coordinates, without a tuple per obstacle
+            x = obstacle.pos[0] * self.grid.tile_width + self.grid.shift.x
+            y = obstacle.pos[1] * self.grid.tile_height + self.grid.shift.y
 
+            # These are the conditions which suggest the PLAYER is NOT colliding with a TILE
+            if player_x + size <= x:
+                continue
+            if player_x - size > x + self.grid.tile_width:
+                continue
+            if player_y + size <= y:
+                continue
+            if player_y - size > y + self.grid.tile_height:
+                continue
+
+            return True
+
+    def get_movement(self):
+        self.last_checked_frame_n += 1
+        if self.last_checked_frame_n <= self.update_movement_every_n_frames:
+            return self.player.movement
+
+        self.last_checked_frame_n = 0
+        with profiler.stage("get_positions"):
+            self.movement_analyser.get_positions()
+        self.movement_percentage = self.movement_analyser.get_movement_percentage()
+        self.player.movement.update(0, self.MOVEMENT_SPEED * self.movement_percentage)
+
+        return self.player.movement
+
+    def reset_rules(self):
+        self.grid.reset()
+
+        self.obstacles = []
+        self.obstacle_summoned = []
+        self.player = Player("#75a743", self.grid.tile_height / 2 * 0.6, (100, self.grid.size[1]/2))
+
+        self.last_checked_frame_n = 0
+        self.update_movement_every_n_frames = 3
+        self.movement_percentage = 0
+
+
+class GameMode1(GameRules):
+    MIN_POSE_TRAVEL = 0.3  # How far below the UP! shoulder height the DOWN! one must be, in shoulder widths
+
+    def __init__(self, grid, difficulty="EASY", movement_analyser=None, score_writer=None):
+        if movement_analyser is None:
+            movement_analyser = MovementAnalyser()
+
+        super().__init__(grid, movement_analyser, difficulty)
+
+        self.score_writer = score_writer
+
+        # The longest each pose can take. A pose that's held still is taken as soon as it's been held for a moment.
         self.down_timer = Timer(3)
         self.up_timer = Timer(3)
+        self.pose_hold = PoseHold()
         self.game_timer = Timer(has_sound=False)
 
         self.intro_check_text = "UP!"
 
-        self.last_checked_frame_n = 0
-        self.update_movement_every_n_frames = 3
-
         self.movement_image = None
 
+        self.recorder = None
+        self.rep_counter = RepCounter()
+
+        self.run_summary_text = ""
+
+        self.tile_rect = pygame.Rect(0, 0, 0, 0)  # Reused by draw_world()
+        self.hud_texts = []
+        self.hud_time = self.hud_player_pos = self.hud_n_reps = self.hud_scale = None
+
         self.game_over_buttons = pygame.sprite.Group()
         self.game_over_buttons.add(UI.Button(None, (settings.WINDOW_SIZE[0]/2, settings.WINDOW_SIZE[1]/2 - 75),
                                              self.restart_game, height=75, width=350, font_size=55, text="PLAY AGAIN!"))
         self.game_over_buttons.add(UI.Button(None, (settings.WINDOW_SIZE[0]/2, settings.WINDOW_SIZE[1]/2 + 75),
                                              self.to_main_menu, height=75, width=350, font_size=55, text="MAIN MENU!"))
 
-        self.middle_game_music = pygame.mixer.Sound(path_join("Music", "One Dream.wav"))
-        self.middle_game_music.set_volume(0.3)
-        self.death_sfx = pygame.mixer.Sound(path_join("Music", "Death Sound Effect.wav"))
-        self.death_sfx.set_volume(0.25)
+        self.middle_game_music = path_join("Music", "One Dream.wav")  # Streamed
+        self.death_sfx = assets.get_sound(path_join("Music", "Death Sound Effect.wav"), volume=0.25)
 
-    def set_difficulty(self, difficulty):
-        self.difficulty = difficulty
-        self.setup_difficulty()
+    def intro_update(self):
+        if self.calibrate():
+            self.start_run()
+            self.game_timer.start()
+            assets.play_music(self.middle_game_music, volume=0.3)
 
-    def setup_difficulty(self):
-        self.spawn_amount = {"EASY": 0.1, "NORMAL": 0.25, "HARD": 0.4}[self.difficulty.upper()]
+            return "MIDDLE GAME"
 
-    def intro_update(self):
-        image = self.movement_analyser.get_positions()
-        self.movement_image = self.movement_analyser.convert_cv2_img_to_pygame_img(image)
+        return "INTRO"
 
-        self.up_timer.start()
+    def calibrate(self):
+        """
+        Runs one frame of the UP! and DOWN! poses. Returns True once both have been captured.
 
-        if self.up_timer.is_over():  # When counter reaches 0
-            self.movement_analyser.get_up_positions()
+        Each pose is taken as soon as the player has held it still (see calibration.py), with the mean shoulder height
+        of the hold rather than a single frame's, stored straight in the movement analyser's means. When its timer runs
+        out first, the pose is taken from the frames seen so far, or the timer starts over if the player isn't in the
+        picture (or, for DOWN!, hasn't gone far enough down).
+        """
 
-            if not self.movement_analyser.up_shoulder_positions or not self.movement_analyser.up_elbow_positions:
-                self.up_timer.reset()
-                self.up_timer.start()
-                return "INTRO"
+        with profiler.stage("get_positions"):
+            image = self.movement_analyser.get_positions()
+        if image is not None:
+            self.movement_image = self.movement_analyser.convert_cv2_img_to_pygame_img(image)
 
-            self.intro_check_text = "DOWN!"
-            self.down_timer.start()
+        is_up = self.intro_check_text == "UP!"
+        timer = self.up_timer if is_up else self.down_timer
+        timer.start()
 
-        if self.down_timer.is_over():  # When counter reaches 0
-            self.movement_analyser.get_down_positions()
+        is_held = self.pose_hold.add(perf_counter(), self.movement_analyser.body_parts)
+        is_timed_out = timer.is_over()  # Only True on the frame the timer runs out
 
-            if not self.movement_analyser.down_shoulder_positions or not self.movement_analyser.down_elbow_positions:
-                self.down_timer.reset()
-                self.down_timer.start()
-                return "INTRO"
+        if not is_held and not is_timed_out:
+            return False
 
-            self.movement_analyser.calculate_setup_means()
-            self.game_timer.start()
-            self.middle_game_music.play(-1)
+        if is_up and self.pose_hold.has_samples:
+            self.movement_analyser.mean_up_shoulder_y = self.pose_hold.mean
 
-            return "MIDDLE GAME"
+            self.intro_check_text = "DOWN!"
+            self.pose_hold.reset()
+            self.down_timer.start()
+            return False
 
-        return "INTRO"
+        # Image y grows downwards, so DOWN! has to be lower than UP!. Holding still higher (on tiptoe) doesn't count.
+        travel = self.pose_hold.mean - self.movement_analyser.mean_up_shoulder_y
+        if not is_up and self.pose_hold.has_samples and travel >= self.MIN_POSE_TRAVEL * self.pose_hold.shoulder_width:
+            self.movement_analyser.mean_down_shoulder_y = self.pose_hold.mean
+            return True
+
+        if is_timed_out:
+            timer.reset()
+            timer.start()
+
+        return False
 
     def intro_draw(self, screen):
         screen.fill("#ebede9")
@@ -113,33 +300,79 @@ class GameMode1:
         timer_text = f"{self.up_timer.get_time(True) if self.intro_check_text == 'UP!' else self.down_timer.get_time(True)}s"
         UI.put_text(screen, text=timer_text, pos=(settings.WINDOW_SIZE[0]/2, settings.WINDOW_SIZE[1] // 2 - 200), anchor="MIDTOP")
 
-        screen.blit(self.movement_image, self.movement_image.get_rect(center=(settings.WINDOW_SIZE[0] / 2, settings.WINDOW_SIZE[1] / 2 + 100)))
+        if self.movement_image is not None:  # No camera frame yet
+            screen.blit(self.movement_image, self.movement_image.get_rect(center=(settings.WINDOW_SIZE[0] / 2, settings.WINDOW_SIZE[1] / 2 + 100)))
         pygame.display.update()
 
     def update(self):
-        if self.check_collisions():
-            self.middle_game_music.stop()
+        if self.step():
+            assets.stop_music(self.middle_game_music)
             self.death_sfx.play()
 
             settings.game_state = "GAME OVER"
 
-            database.insert_score(settings.user, self.difficulty, self.game_timer.get_time())
+            score = self.game_timer.get_time()
+            if self.score_writer is not None:
+                # The summary's queries run on the writer thread (before the score is written, which they expect),
+                # so a busy database can't hold up this frame. Until they're done the summary is just the score.
+                self.run_summary_text = f"{score}s"
+                self.score_writer.submit_task(lambda: setattr(self, "run_summary_text", self.get_run_summary(score)))
+                self.score_writer.submit(settings.user, self.difficulty, score)
+            else:
+                self.run_summary_text = self.get_run_summary(score)
+                database.insert_score(settings.user, self.difficulty, score)
+            self.save_workout()
+            self.stop_recording(is_game_over=True)
+
+    def save_workout(self):
+        duration = perf_counter() - self.rep_counter.start_time
+        rep_times, signal = self.rep_counter.finish()
+        workout = (settings.user, self.difficulty, duration, self.rep_counter.n_reps, self.rep_counter.signal_rate,
+                   rep_times, signal)
+
+        if self.score_writer is not None:
+            self.score_writer.submit_workout(*workout)
             return
 
-        self.generate_obstacles(self.generate_obstacle_positions(self.grid.convert_local_coordinates_to_pos(self.player.pos)))
-        self.clear_obstacles()
+        try:
+            database.insert_workout(*workout)
+        except database.sqlite3.Error as error:
+            print(f"COULDN'T SAVE THE WORKOUT! {error}")
+
+    def draw_world(self, screen, scale=1):
+        """
+        Draws the player and the obstacles onto a surface scale times the size of the display.
+        """
 
-    def draw(self, screen):
-        self.player.draw(screen)
+        self.player.draw(screen, scale)
 
+        tile_rect = self.tile_rect
+        tile_rect.size = (ceil(self.grid.tile_width * scale), ceil(self.grid.tile_height * scale))
         for tile in self.obstacles:
-            pygame.draw.rect(screen, tile.color, pygame.Rect(*self.grid.convert_pos_to_coordinates(tile.pos),
-                                                             self.grid.tile_width, self.grid.tile_height))
+            tile_rect.x = round((tile.pos[0] * self.grid.tile_width + self.grid.shift.x) * scale)
+            tile_rect.y = round((tile.pos[1] * self.grid.tile_height + self.grid.shift.y) * scale)
+            pygame.draw.rect(screen, tile.color, tile_rect)
 
-        UI.put_text(screen, text=f"Time Survived: {self.game_timer.get_time()}s", pos=(30, 30), anchor="TOPLEFT")
+    def draw_hud(self, screen, scale=1):
+        time_survived = self.game_timer.get_time()
         player_pos = self.grid.convert_local_coordinates_to_pos(self.player.pos)
-        UI.put_text(screen, text=f"Position: {player_pos[0]}, {-player_pos[1]}",
-                    pos=(30, 90), anchor="TOPLEFT")
+        n_reps = self.rep_counter.n_reps
+
+        # The text only changes every few frames, so it's rendered again only then
+        if (time_survived != self.hud_time or player_pos != self.hud_player_pos or n_reps != self.hud_n_reps
+                or scale != self.hud_scale):
+            self.hud_time, self.hud_player_pos, self.hud_n_reps, self.hud_scale = time_survived, player_pos, n_reps, scale
+            self.hud_texts = [
+                UI.put_text(screen, text=f"Time Survived: {time_survived}s", pos=(30 * scale, 30 * scale),
+                            font_size=round(50 * scale), anchor="TOPLEFT"),
+                UI.put_text(screen, text=f"Position: {player_pos[0]}, {-player_pos[1]}", pos=(30 * scale, 90 * scale),
+                            font_size=round(50 * scale), anchor="TOPLEFT"),
+                UI.put_text(screen, text=f"Reps: {n_reps}", pos=(30 * scale, 150 * scale),
+                            font_size=round(50 * scale), anchor="TOPLEFT")]
+            return
+
+        for text_surf, text_rect in self.hud_texts:
+            screen.blit(text_surf, text_rect)
 
     def game_over_update(self, event):
         self.game_over_buttons.update(event)
@@ -148,103 +381,82 @@ class GameMode1:
         screen.fill((255, 75, 75))
 
         UI.put_text(screen, is_underlined=True, text="GAME OVER!", font_size=120, pos=(settings.WINDOW_SIZE[0]/2, settings.WINDOW_SIZE[1] // 2 - 350), anchor="MIDTOP")
+        UI.put_text(screen, text=self.run_summary_text, pos=(settings.WINDOW_SIZE[0]/2, settings.WINDOW_SIZE[1] // 2 - 200), anchor="MIDTOP")
+        UI.put_text(screen, text=f"{self.rep_counter.n_reps} REPS!", font_size=40, pos=(settings.WINDOW_SIZE[0]/2, settings.WINDOW_SIZE[1] // 2 - 140), anchor="MIDTOP")
         self.game_over_buttons.draw(screen)
 
-    def generate_obstacle_positions(self, pos):
-        line_n_tiles_y = self.grid.line_height // self.grid.tile_height
-        line_n_tiles_x = self.grid.line_width // self.grid.tile_width
+    def get_run_summary(self, score):
+        """
+        Compares the run with the player's stored scores. It runs before the score is written, so the score itself
+        isn't among them yet.
+        """
+
+        try:
+            personal_best = database.get_personal_best(settings.user, self.difficulty)
+            top_percentage = database.get_top_percentage(self.difficulty, score, is_stored=False)
+        except database.sqlite3.Error as error:
+            print(f"COULDN'T LOAD THE RUN SUMMARY! {error}")
+            return ""
+
+        if personal_best is None or score > personal_best:
+            best_text = "NEW PERSONAL BEST!"
+        else:
+            best_text = f"Personal best: {personal_best}s"
+
+        return f"{score}s - {best_text} - Top {max(1, round(top_percentage))}% on {self.difficulty}"
+
+    def start_run(self):
+        """
+        Seeds the obstacle RNG for the run that is starting, so a recording of it can be replayed exactly.
+        """
+
+        seed = random.randrange(2 ** 63)
+        self.rng = random.Random(seed)
+        self.rep_counter.reset()
+
+        if settings.RECORD_SESSIONS:
+            self.recorder = session_recorder.start_recording(seed, self.difficulty,
+                                                             (self.grid.tile_width, self.grid.tile_height), self.player.pos)
+
+        if settings.RECORD_VIDEO:
+            # The camera is read every update_movement_every_n_frames + 1 frames
+            fps = settings.FPS / (self.update_movement_every_n_frames + 1)
+            self.movement_analyser.video_recorder = video_recorder.start_recording(self.difficulty, fps)
+
+    def stop_recording(self, is_game_over=False):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+        if self.movement_analyser.video_recorder is not None:
+            self.movement_analyser.video_recorder.close(is_saved=is_game_over)
+            self.movement_analyser.video_recorder = None
 
-        pos = (pos[0] + line_n_tiles_x, pos[1])
-
-        obstacles = [(pos[0], random.randint(pos[1] - round(line_n_tiles_y*3), pos[1] + round(line_n_tiles_y*3)))
-                     for _ in range(0, random.randint(1, int((self.grid.max_y-self.grid.min_y) * self.spawn_amount // self.grid.tile_height)))]
-
-        return obstacles
-
-    def generate_obstacles(self, positions):
-        if positions[0][0] in self.obstacle_summoned:
-            return
-
-        for position in positions:
-            for obstacle in self.obstacles:
-                if position == obstacle.pos:
-                    break
-            else:
-                self.obstacles.append(Tile(position, (230, 10, 20)))
-
-        self.obstacle_summoned.append(positions[0][0])
-
-    def clear_obstacles(self):
-        line_n_tiles_x = self.grid.line_width // self.grid.tile_width
-        line_n_tiles_y = self.grid.line_height // self.grid.tile_height
-
-        player_pos = self.grid.convert_local_coordinates_to_pos(self.player.pos)
-
-        for obstacle in self.obstacles.copy():
-            if obstacle.pos[0] < player_pos[0] - round(line_n_tiles_x * 3):
-                try:
-                    self.obstacle_summoned.remove(obstacle.pos[0])
-                except ValueError:
-                    pass
-
-                self.obstacles.remove(obstacle)
-
-            elif obstacle.pos[0] > player_pos[0] + round(line_n_tiles_x * 3):
-                try:
-                    self.obstacle_summoned.remove(obstacle.pos[0])
-                except ValueError:
-                    pass
-
-                self.obstacles.remove(obstacle)
-
-            elif obstacle.pos[1] < player_pos[1] - round(line_n_tiles_y * 3):
-                try:
-                    self.obstacle_summoned.remove(obstacle.pos[0])
-                except ValueError:
-                    pass
-
-                self.obstacles.remove(obstacle)
-
-            elif obstacle.pos[1] > player_pos[1] + round(line_n_tiles_y * 3):
-                try:
-                    self.obstacle_summoned.remove(obstacle.pos[0])
-                except ValueError:
-                    pass
+    def get_movement(self):
+        movement = super().get_movement()
 
-                self.obstacles.remove(obstacle)
+        if self.last_checked_frame_n == 0:  # The camera was read on this frame
+            self.rep_counter.add(self.movement_percentage)
 
-    def check_collisions(self):
-        for obstacle in self.obstacles:
-            # These are the conditions which suggest the PLAYER is NOT colliding with a TILE
-            if self.player.pos[0] + self.player.size <= self.grid.convert_pos_to_coordinates(obstacle.pos)[0]:
-                continue
-            if self.player.pos[0] - self.player.size > self.grid.convert_pos_to_coordinates(obstacle.pos)[0] + self.grid.tile_width:
-                continue
-            if self.player.pos[1] + self.player.size <= self.grid.convert_pos_to_coordinates(obstacle.pos)[1]:
-                continue
-            if self.player.pos[1] - self.player.size > self.grid.convert_pos_to_coordinates(obstacle.pos)[1] + self.grid.tile_height:
-                continue
+        if self.recorder is not None:
+            self.recorder.write_frame(self.last_checked_frame_n == 0, self.movement_analyser.body_parts,
+                                      self.movement_percentage)
 
-            return True
+        return movement
 
     def restart_game(self):
-        self.grid.reset()
-
-        self.obstacles = []
-        self.obstacle_summoned = []
-        self.player = Player("#75a743", self.grid.tile_height / 2 * 0.6, (100, settings.WINDOW_SIZE[1]/2))
+        self.stop_recording()
+        self.reset_rules()
 
         self.movement_analyser.reset()
 
         self.down_timer.reset()
         self.up_timer.reset()
+        self.pose_hold.reset()
         self.game_timer.reset()
 
         self.intro_check_text = "UP!"
 
-        self.last_checked_frame_n = 0
-        self.update_movement_every_n_frames = 3
-
         self.movement_image = None
 
         settings.game_state = "INTRO"
@@ -254,16 +466,6 @@ class GameMode1:
 
         settings.game_state = "MAIN MENU"
 
-    def get_movement(self):
-        self.last_checked_frame_n += 1
-        if self.last_checked_frame_n <= self.update_movement_every_n_frames:
-            return self.player.movement
-
-        self.last_checked_frame_n = 0
-        self.movement_analyser.get_positions()
-        self.player.movement = pygame.Vector2(0, self.MOVEMENT_SPEED * self.movement_analyser.get_movement_percentage())
-
-        return self.player.movement
-
     def close(self):
+        self.stop_recording()
         self.movement_analyser.close_analyser()
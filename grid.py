@@ -0,0 +1,114 @@
+import pygame
+from math import floor, ceil
+import settings
+
+
+class Grid:
+    def __init__(self, color, tile_size, outer_size=1, size=None):
+        """
+        size is the area the grid is drawn on, the window by default. A split-screen viewport passes its own size.
+        """
+
+        self.color = color
+        self.tile_width, self.tile_height = tile_size
+        self.size = size or settings.WINDOW_SIZE
+
+        self.grid = {"VERTICALS": [], "HORIZONTALS": []}
+
+        self.grid_width, self.grid_height = self.calculate_grid_size()
+
+        self.line_width = self.grid_width * self.tile_width
+        self.line_height = self.grid_height * self.tile_height
+
+        self.min_x = -self.tile_width
+        self.min_y = floor(-self.line_height * outer_size)
+
+        self.max_x = ceil(self.line_width * (1 + outer_size))
+        self.max_y = ceil(self.line_height * (1 + outer_size))
+
+        self.calculate_grid()
+
+        self.shift = pygame.Vector2(0, 0)
+        self.draw_start = pygame.Vector2(0, 0)  # Reused by draw()
+        self.draw_end = pygame.Vector2(0, 0)
+
+    def get_number_of_lines(self):
+        return len(self.grid["VERTICALS"]) + len(self.grid["HORIZONTALS"])
+
+    def calculate_grid_size(self):
+        return ceil(self.size[0] / self.tile_width), ceil(self.size[1] / self.tile_height)
+
+    def calculate_grid(self):
+        # Each line is a pair of Vector2s that update() moves in place, so nothing is allocated per frame
+        self.grid["VERTICALS"].clear()
+        self.grid["HORIZONTALS"].clear()
+
+        for column in range(self.min_x, self.max_x + self.tile_width, self.tile_width):
+            for i in range(self.min_y, self.max_y, self.line_height):
+                self.grid["VERTICALS"].append((pygame.Vector2(column, i), pygame.Vector2(column, i + self.line_height)))
+
+        for row in range(self.min_y, self.max_y + self.tile_height, self.tile_height):
+            for i in range(self.min_x, self.max_x, self.line_width):
+                self.grid["HORIZONTALS"].append((pygame.Vector2(i, row), pygame.Vector2(i + self.line_width, row)))
+
+    def update(self, shift):
+        self.shift = shift
+
+        shift_x_constrained = self.tile_width * (shift.x // self.tile_width)
+        shift_y_constrained = self.tile_height * (shift.y // self.tile_height)
+
+        # The bounds in the lines' own (unshifted) coordinates, so the loops below only compare
+        min_x, max_x = self.min_x - shift_x_constrained, self.max_x - shift_x_constrained
+        min_y, max_y = self.min_y - shift_y_constrained, self.max_y - shift_y_constrained
+        line_width, line_height = self.line_width, self.line_height
+
+        for start, end in self.grid["VERTICALS"]:
+            if start.x < min_x:  # Going Right
+                start.x = end.x = max_x
+
+            if start.y < min_y:  # Going Down
+                start.y = max_y - line_height
+                end.y = max_y
+
+            elif end.y > max_y:  # Going Up
+                start.y = min_y
+                end.y = min_y + line_height
+
+        for start, end in self.grid["HORIZONTALS"]:
+            if start.y < min_y:  # Going Down
+                start.y = end.y = max_y
+
+            elif start.y > max_y:  # Going Up
+                start.y = end.y = min_y
+
+            if end.x <= min_x:  # Going Right
+                start.x = max_x - line_width
+                end.x = max_x
+
+    def draw(self, screen, scale=1):
+        start_pos, end_pos = self.draw_start, self.draw_end
+
+        for lines in self.grid.values():
+            for start, end in lines:
+                start_pos.update(start)
+                start_pos += self.shift
+                start_pos *= scale
+                end_pos.update(end)
+                end_pos += self.shift
+                end_pos *= scale
+
+                pygame.draw.line(screen, self.color, start_pos, end_pos)
+
+    def convert_pos_to_coordinates(self, pos):  # (1, 1) -> (Tile Width, Tile Height)
+        return pos[0] * self.tile_width + self.shift.x, pos[1] * self.tile_height + self.shift.y
+
+    def convert_local_coordinates_to_pos(self, coordinates):  # (Tile Width, Tile Height) -> (1, 1) | Local Coordinates
+        return int((coordinates[0] - self.shift.x) // self.tile_width), int(
+            (coordinates[1] - self.shift.y) // self.tile_height)
+
+    def convert_world_coordinates_to_pos(self, coordinates):  # (Tile Width, Tile Height) -> (1, 1) | World Coordinates
+        return int(coordinates[0] // self.tile_width), int(coordinates[1] // self.tile_height)
+
+    def reset(self):
+        self.shift.x, self.shift.y = 0, 0
+        self.calculate_grid()
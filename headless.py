@@ -0,0 +1,170 @@
+"""
+Runs the GameMode1 rules without a screen, a sound card or a camera.
+
+The movement input comes from a script (or a list of replayed movement percentages) instead of the webcam and the
+engine steps as fast as the CPU allows, which makes it usable for profiling and for balancing the difficulties.
+
+Usage: python headless.py --difficulty HARD --script random --runs 20 --seed 1
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import random
+from math import sin, pi
+from statistics import mean, median
+from time import perf_counter
+import pygame
+import settings
+from grid import Grid
+from game_mode1 import GameRules
+
+
+class ScriptedMovementAnalyser:
+    """
+    Stands in for MovementAnalyser. The script is either a function of the sample number or a sequence of movement
+    percentages, in which case the last value is held once the sequence runs out.
+    """
+
+    def __init__(self, script=None):
+        self.script = script if script is not None else still_script
+        self.sample_n = -1
+        self.percentage = 0
+
+        self.video_recorder = None
+
+    def get_positions(self):
+        self.sample_n += 1
+
+        if callable(self.script):
+            self.percentage = self.script(self.sample_n)
+        elif self.sample_n < len(self.script):
+            self.percentage = self.script[self.sample_n]
+
+    def get_movement_percentage(self):
+        return max(-1, min(1, self.percentage))
+
+    def reset(self):
+        self.sample_n = -1
+        self.percentage = 0
+
+    def close_analyser(self):
+        pass
+
+
+def still_script(sample_n):
+    return 0
+
+
+def sine_script(period=40):
+    """Smooth push-ups: one full rep every "period" samples."""
+
+    return lambda sample_n: sin(2 * pi * sample_n / period)
+
+
+def random_script(seed=None, hold=5):
+    """A new random percentage every "hold" samples."""
+
+    rng = random.Random(seed)
+    values = []
+
+    def script(sample_n):
+        while len(values) <= sample_n // hold:
+            values.append(rng.uniform(-1, 1))
+
+        return values[sample_n // hold]
+
+    return script
+
+
+SCRIPTS = {"still": lambda seed: still_script, "sine": lambda seed: sine_script(),
+           "random": lambda seed: random_script(seed)}
+
+
+class RunReport:
+    def __init__(self, difficulty, frame_n, is_over, step_times):
+        self.difficulty = difficulty
+        self.frame_n = frame_n
+        self.is_over = is_over
+        self.survival_time = frame_n / settings.FPS  # In game seconds, as if the game ran at the FPS cap
+
+        sorted_times = sorted(step_times)
+        self.mean_step_time = mean(sorted_times) if sorted_times else 0
+        self.median_step_time = median(sorted_times) if sorted_times else 0
+        self.p95_step_time = sorted_times[int(len(sorted_times) * 0.95)] if sorted_times else 0
+        self.max_step_time = sorted_times[-1] if sorted_times else 0
+
+    def __str__(self):
+        return (f"{self.difficulty}: survived {self.survival_time:.2f}s ({self.frame_n} frames"
+                f"{'' if self.is_over else ', still alive'}) | step mean {self.mean_step_time * 1e6:.1f}us, "
+                f"p95 {self.p95_step_time * 1e6:.1f}us, max {self.max_step_time * 1e6:.1f}us")
+
+
+class HeadlessEngine:
+    def __init__(self, difficulty="EASY", script=None, seed=None, window_size=(1920, 1080), n_vertical_tiles=10,
+                 movement_analyser=None):
+        settings.WINDOW_SIZE = window_size
+
+        self.grid = Grid("GRAY", (window_size[1] // n_vertical_tiles, window_size[1] // n_vertical_tiles))
+        self.movement_analyser = movement_analyser or ScriptedMovementAnalyser(script)
+        self.rules = GameRules(self.grid, self.movement_analyser, difficulty, rng=random.Random(seed))
+
+        self.shift = pygame.Vector2(0, 0)
+        self.frame_n = 0
+        self.is_over = False
+        self.step_times = []
+
+    def step(self):
+        """
+        Runs one MIDDLE GAME frame in the same order as Game.main_loop, minus the drawing.
+        """
+
+        start = perf_counter()
+
+        self.shift.x -= self.rules.SCREEN_SLIDING_SPEED
+        self.shift += self.rules.get_movement()
+        self.grid.update(self.shift)
+
+        self.is_over = self.rules.step()
+
+        self.step_times.append(perf_counter() - start)
+        self.frame_n += 1
+
+        return self.is_over
+
+    def run(self, max_frames=settings.FPS * 600):
+        while not self.is_over and self.frame_n < max_frames:
+            self.step()
+
+        return RunReport(self.rules.difficulty, self.frame_n, self.is_over, self.step_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs GameMode1 headless with a scripted movement input.")
+    parser.add_argument("--difficulty", default="EASY", choices=list(GameRules.SPAWN_AMOUNTS))
+    parser.add_argument("--script", default="random", choices=list(SCRIPTS))
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--max-frames", type=int, default=settings.FPS * 600)
+    parser.add_argument("--window-size", type=int, nargs=2, default=(1920, 1080))
+    args = parser.parse_args()
+
+    reports = []
+
+    for run_n in range(args.runs):
+        seed = None if args.seed is None else args.seed + run_n
+        engine = HeadlessEngine(args.difficulty, SCRIPTS[args.script](seed), seed, tuple(args.window_size))
+
+        reports.append(engine.run(args.max_frames))
+        print(reports[-1])
+
+    if len(reports) > 1:
+        print(f"Mean survival: {mean(report.survival_time for report in reports):.2f}s | "
+              f"Median survival: {median(report.survival_time for report in reports):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
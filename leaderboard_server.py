@@ -0,0 +1,142 @@
+"""
+A stand-in for the shared leaderboard service that score_sync.py talks to, so syncing can be tried out and tested
+without a network. It keeps every kiosk's scores in its own SQLite file.
+
+--failure-rate and --latency make it flaky and slow on purpose, to watch the client back off and catch up.
+
+Usage: python leaderboard_server.py [--port 8765] [--db leaderboard_service.db] [--failure-rate 0.3] [--latency 0.5]
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from time import sleep
+from urllib.parse import urlsplit, parse_qs
+
+
+class LeaderboardService:
+    def __init__(self, path):
+        self.lock = Lock()  # One connection shared by the handler threads
+
+        self.db_connection = sqlite3.connect(path, check_same_thread=False)
+        self.db_connection.execute("PRAGMA journal_mode = WAL;")
+        self.db_connection.execute("CREATE TABLE IF NOT EXISTS scores (kioskId TEXT, scoreId INTEGER, playerName TEXT, difficulty TEXT, "
+                                   "score INTEGER, playedAt INTEGER, PRIMARY KEY (kioskId, scoreId));")
+        self.db_connection.execute("CREATE INDEX IF NOT EXISTS scoresDifficultyScore ON scores (difficulty, score DESC);")
+        self.db_connection.commit()
+
+    def add_scores(self, kiosk_id, rows):
+        """
+        Returns how many of the rows were new. Rows the kiosk already sent are ignored.
+        """
+
+        with self.lock, self.db_connection:
+            before = self.db_connection.total_changes
+            self.db_connection.executemany("INSERT OR IGNORE INTO scores VALUES (?, ?, ?, ?, ?, ?);",
+                                           [(kiosk_id, *row) for row in rows])
+
+            return self.db_connection.total_changes - before
+
+    def get_leaderboards(self, n):
+        with self.lock:
+            rows = self.db_connection.execute(
+                "SELECT difficulty, playerName, score FROM ("
+                "    SELECT difficulty, playerName, score,"
+                "           ROW_NUMBER() OVER (PARTITION BY difficulty ORDER BY score DESC, playedAt, rowid) AS place"
+                "    FROM scores) "
+                "WHERE place <= ? ORDER BY difficulty, place;", (n,)).fetchall()
+
+        leaderboards = {}
+        for difficulty, player_name, score in rows:
+            leaderboards.setdefault(difficulty, []).append([player_name, score])
+
+        return leaderboards
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    service = None
+    failure_rate = 0
+    latency = 0
+
+    def do_GET(self):
+        if not self.is_lucky():
+            return
+
+        url = urlsplit(self.path)
+        if url.path != "/leaderboards":
+            self.send_json(404, {"error": "not found"})
+            return
+
+        try:
+            n = int(parse_qs(url.query).get("n", ["10"])[0])
+        except ValueError:
+            self.send_json(400, {"error": "n must be a number"})
+            return
+
+        self.send_json(200, self.service.get_leaderboards(n))
+
+    def do_POST(self):
+        if not self.is_lucky():
+            return
+
+        if urlsplit(self.path).path != "/scores":
+            self.send_json(404, {"error": "not found"})
+            return
+
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            kiosk_id = str(payload["kiosk"])
+            rows = [(int(score_id), str(player_name), str(difficulty), int(score), played_at)
+                    for score_id, player_name, difficulty, score, played_at in payload["scores"]]
+        except (ValueError, KeyError, TypeError) as error:
+            self.send_json(400, {"error": repr(error)})
+            return
+
+        self.send_json(200, {"accepted": self.service.add_scores(kiosk_id, rows)})
+
+    def is_lucky(self):
+        sleep(self.latency)
+
+        if random.random() < self.failure_rate:
+            self.send_json(503, {"error": "failing on purpose"})
+            return False
+
+        return True
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves a shared leaderboard for score_sync.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="leaderboard_service.db")
+    parser.add_argument("--failure-rate", type=float, default=0, help="Share of requests answered with a 503")
+    parser.add_argument("--latency", type=float, default=0, help="Seconds each request is held before it's answered")
+    args = parser.parse_args()
+
+    RequestHandler.service = LeaderboardService(args.db)
+    RequestHandler.failure_rate = args.failure_rate
+    RequestHandler.latency = args.latency
+
+    server = ThreadingHTTPServer((args.host, args.port), RequestHandler)
+    print(f"Serving the leaderboard on http://{args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,128 +1,27 @@
 import pygame
 from pygame import Vector2
-from math import floor, ceil
 from game_mode1 import GameMode1
+from grid import Grid
 from sys import exit as sys_exit
 import settings
 import UI
 import database
+from score_writer import ScoreWriter
+from score_sync import ScoreSync
+from db_maintenance import IdleMaintenance
+from profiler import profiler
+from metrics import metrics
+from assets import assets
+from resolution_scaler import ResolutionScaler
+from time import perf_counter
 from os.path import join as path_join
 
 pygame.init()
 
 
-class Grid:
-    def __init__(self, color, tile_size, outer_size=1):
-        self.color = color
-        self.tile_width, self.tile_height = tile_size
-
-        self.grid = {"VERTICALS": [], "HORIZONTALS": []}
-
-        self.grid_width, self.grid_height = self.calculate_grid_size()
-
-        self.line_width = self.grid_width * self.tile_width
-        self.line_height = self.grid_height * self.tile_height
-
-        self.min_x = -self.tile_width
-        self.min_y = floor(-self.line_height * outer_size)
-
-        self.max_x = ceil(self.line_width * (1 + outer_size))
-        self.max_y = ceil(self.line_height * (1 + outer_size))
-
-        self.calculate_grid()
-
-        self.shift = pygame.Vector2(0, 0)
-
-    def get_number_of_lines(self):
-        return len(self.grid["VERTICALS"]) + len(self.grid["HORIZONTALS"])
-
-    def calculate_grid_size(self):
-        return ceil(settings.WINDOW_SIZE[0] / self.tile_width), ceil(settings.WINDOW_SIZE[1] / self.tile_height)
-
-    def calculate_grid(self):
-        for column in range(self.min_x, self.max_x + self.tile_width, self.tile_width):
-            for i in range(self.min_y, self.max_y, self.line_height):
-                self.grid["VERTICALS"].append(((column, i), (column, i + self.line_height)))
-
-        for row in range(self.min_y, self.max_y + self.tile_height, self.tile_height):
-            for i in range(self.min_x, self.max_x, self.line_width):
-                self.grid["HORIZONTALS"].append(((i, row), (i + self.line_width, row)))
-
-    def update(self, shift):
-        self.shift = shift
-
-        shift_x_constrained = self.tile_width * (shift.x // self.tile_width)
-        shift_y_constrained = self.tile_height * (shift.y // self.tile_height)
-
-        for start, end in self.grid["VERTICALS"].copy():
-            has_updated_pos = False
-            new_start = start
-            new_end = end
-
-            if start[0] + shift_x_constrained < self.min_x:  # Going Right
-                has_updated_pos = True
-                new_start = (self.max_x - shift_x_constrained, new_start[1])
-                new_end = (self.max_x - shift_x_constrained, new_end[1])
-
-            if start[1] + shift_y_constrained < self.min_y:  # Going Down
-                has_updated_pos = True
-                new_start = (new_start[0], self.max_y - shift_y_constrained - self.line_height)
-                new_end = (new_end[0], self.max_y - shift_y_constrained)
-
-            elif end[1] + shift_y_constrained > self.max_y:  # Going Up
-                has_updated_pos = True
-                new_start = (new_start[0], self.min_y - shift_y_constrained)
-                new_end = (new_end[0], self.min_y - shift_y_constrained + self.line_height)
-
-            if has_updated_pos:
-                self.grid["VERTICALS"].remove((start, end))
-                self.grid["VERTICALS"].append((new_start, new_end))
-
-        for start, end in self.grid["HORIZONTALS"].copy():
-            has_updated_pos = False
-            new_start = start
-            new_end = end
-
-            if start[1] + shift_y_constrained < self.min_y:  # Going Down
-                has_updated_pos = True
-                new_start = (start[0], self.max_y - shift_y_constrained)
-                new_end = (end[0], self.max_y - shift_y_constrained)
-
-            elif start[1] + shift_y_constrained > self.max_y:  # Going Up
-                has_updated_pos = True
-                new_start = (start[0], self.min_y - shift_y_constrained)
-                new_end = (end[0], self.min_y - shift_y_constrained)
-
-            if end[0] + shift_x_constrained <= self.min_x:  # Going Right
-                has_updated_pos = True
-                new_start = (self.max_x - shift_x_constrained - self.line_width, start[1])
-                new_end = (self.max_x - shift_x_constrained, end[1])
-
-            if has_updated_pos:
-                self.grid["HORIZONTALS"].remove((start, end))
-                self.grid["HORIZONTALS"].append((new_start, new_end))
-
-    def draw(self, screen):
-        for start, end in (*self.grid["HORIZONTALS"], *self.grid["VERTICALS"]):
-            pygame.draw.line(screen, self.color, start + self.shift, end + self.shift)
-
-    def convert_pos_to_coordinates(self, pos):  # (1, 1) -> (Tile Width, Tile Height)
-        return pos[0] * self.tile_width + self.shift.x, pos[1] * self.tile_height + self.shift.y
-
-    def convert_local_coordinates_to_pos(self, coordinates):  # (Tile Width, Tile Height) -> (1, 1) | Local Coordinates
-        return int((coordinates[0] - self.shift.x) // self.tile_width), int(
-            (coordinates[1] - self.shift.y) // self.tile_height)
-
-    def convert_world_coordinates_to_pos(self, coordinates):  # (Tile Width, Tile Height) -> (1, 1) | World Coordinates
-        return int(coordinates[0] // self.tile_width), int(coordinates[1] // self.tile_height)
-
-    def reset(self):
-        self.shift.x, self.shift.y = 0, 0
-        self.calculate_grid()
-
-
 class Game:
-    SCREEN_SLIDING_SPEED = 5
+    SCREEN_SLIDING_SPEED = GameMode1.SCREEN_SLIDING_SPEED
+    LEADERBOARD_REFRESH_INTERVAL = 5  # s, to pick up the scores of the other game processes sharing game.db
 
     def __init__(self):
         settings.SCREEN = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
@@ -135,10 +34,34 @@ class Game:
         self.clock = pygame.time.Clock()
         self.shift = Vector2(0, 0)
 
+        if settings.METRICS_PORT:
+            metrics.start_server(settings.METRICS_PORT, settings.METRICS_HOST)
+
+        self.resolution_scaler = ResolutionScaler(settings.WINDOW_SIZE, settings.RENDER_SCALES, settings.RENDER_TIME_BUDGET)
+
         n_vertical_tiles = 10
         self.grid = Grid("GRAY", (settings.WINDOW_SIZE[1] // n_vertical_tiles, settings.WINDOW_SIZE[1] // n_vertical_tiles))
 
-        self.game_mode1 = GameMode1(self.grid, "EASY")
+        self.is_leaderboard_outdated = True
+        self.leaderboard_time = 0  # perf_counter() of the last update_leaderboard
+        self.score_writer = ScoreWriter(on_durable=self.on_scores_saved)
+
+        self.score_sync = None
+        if settings.SYNC_URL:
+            self.score_sync = ScoreSync(settings.SYNC_URL, interval=settings.SYNC_INTERVAL,
+                                        on_update=lambda: setattr(self, "is_leaderboard_outdated", True))
+            self.score_sync.start()
+        else:
+            database.disable_score_sync()  # In case this game.db used to sync
+
+        self.maintenance = None
+        if settings.IDLE_MAINTENANCE:
+            self.maintenance = IdleMaintenance(lambda: settings.game_state in ("SIGN IN", "MAIN MENU"),
+                                               settings.ARCHIVE_SCORES_AFTER_MONTHS, settings.ARCHIVE_KEEP_TOP,
+                                               settings.ARCHIVE_DIR)
+            self.maintenance.start()
+
+        self.game_mode1 = GameMode1(self.grid, "EASY", score_writer=self.score_writer)
         settings.game_state = "SIGN IN"
 
         self.main_menu_ui = pygame.sprite.Group()
@@ -154,13 +77,13 @@ class Game:
 
         self.leaderboard_easy = UI.Table((settings.WINDOW_SIZE[0] // 5, settings.WINDOW_SIZE[1] // 2 - 95), title="EASY Mode Leaderboard", title_bg_color="#a8ca58",
                                          bg_color="#d0da91", font_size=25, has_outline=True, cell_width=125,
-                                         cell_height=40, row_n=4, column_labels=["Player Name", "Score"], data=database.get_high_scores("EASY", 3))
+                                         cell_height=40, row_n=4, column_labels=["Player Name", "Score"], data=self.get_high_scores("EASY"))
         self.leaderboard_normal = UI.Table((settings.WINDOW_SIZE[0] // 1.25, settings.WINDOW_SIZE[1] // 2 - 95), title="NORMAL Mode Leaderboard", title_bg_color="#73bed3",
                                            bg_color="#a4dddb", font_size=25, has_outline=True, cell_width=125,
-                                           cell_height=40, row_n=4, column_labels=["Player Name", "Score"], data=database.get_high_scores("NORMAL", 3))
+                                           cell_height=40, row_n=4, column_labels=["Player Name", "Score"], data=self.get_high_scores("NORMAL"))
         self.leaderboard_hard = UI.Table((settings.WINDOW_SIZE[0] // 1.25, settings.WINDOW_SIZE[1] // 2 + 130), title="HARD Mode Leaderboard", title_bg_color="#cf573c",
                                          bg_color="#da863e", font_size=25, has_outline=True, cell_width=125,
-                                         cell_height=40, row_n=4, column_labels=["Player Name", "Score"], data=database.get_high_scores("HARD", 3))
+                                         cell_height=40, row_n=4, column_labels=["Player Name", "Score"], data=self.get_high_scores("HARD"))
 
         self.update_leaderboard()
 
@@ -190,14 +113,32 @@ class Game:
 
         self.sign_in_error = ""
 
-        self.main_menu_music = pygame.mixer.Sound(path_join("Music", "Fake Spring.wav"))
-        self.main_menu_music.set_volume(0.85)
+        self.main_menu_music = path_join("Music", "Fake Spring.wav")  # Streamed
         self.is_main_menu_music_playing = False
 
+    def on_scores_saved(self, rows):
+        self.is_leaderboard_outdated = True
+
+        if self.score_sync is not None:
+            self.score_sync.notify()
+
+    def get_high_scores(self, difficulty):
+        if self.score_sync is not None:
+            return database.get_shared_high_scores(difficulty, 3)
+
+        return database.get_high_scores(difficulty, 3)
+
     def update_leaderboard(self):
-        self.leaderboard_easy.reinit_data(database.get_high_scores("EASY", 3))
-        self.leaderboard_normal.reinit_data(database.get_high_scores("NORMAL", 3))
-        self.leaderboard_hard.reinit_data(database.get_high_scores("HARD", 3))
+        self.is_leaderboard_outdated = False
+        self.leaderboard_time = perf_counter()
+
+        self.leaderboard_easy.reinit_data(self.get_high_scores("EASY"))
+        self.leaderboard_normal.reinit_data(self.get_high_scores("NORMAL"))
+        self.leaderboard_hard.reinit_data(self.get_high_scores("HARD"))
+
+        self.leaderboard_easy.generate_image()
+        self.leaderboard_normal.generate_image()
+        self.leaderboard_hard.generate_image()
 
     def log_out(self):
         settings.user = None
@@ -258,55 +199,90 @@ class Game:
         self.main_menu_ui.draw(settings.SCREEN)
 
     def middle_game_draw(self):
-        settings.SCREEN.fill("#ebede9")
+        with profiler.stage("Grid.update"):
+            self.grid.update(self.shift)
+
+        render_start = perf_counter()
+        surface = self.resolution_scaler.get_surface(settings.SCREEN)
+        scale = self.resolution_scaler.scale
+
+        surface.fill("#ebede9")
+        with profiler.stage("Grid.draw"):
+            self.grid.draw(surface, scale)
+
+        with profiler.stage("GameMode1.draw"):
+            self.game_mode1.draw_world(surface, scale)
+            if not settings.HUD_AT_NATIVE_RESOLUTION:
+                self.game_mode1.draw_hud(surface, scale)
 
-        self.grid.update(self.shift)
-        self.grid.draw(settings.SCREEN)
+        with profiler.stage("present"):
+            self.resolution_scaler.present(settings.SCREEN)
 
-        self.game_mode1.draw(settings.SCREEN)
+        if settings.DYNAMIC_RESOLUTION:
+            self.resolution_scaler.record(perf_counter() - render_start)
+
+        if settings.HUD_AT_NATIVE_RESOLUTION:
+            self.game_mode1.draw_hud(settings.SCREEN)
         self.game_mode1.update()
 
     def main_loop(self):
         while True:
+            self.run_frame()
+
+    def run_frame(self):
+        """
+        One frame of whichever screen the game is on.
+        """
+
+        with profiler.stage("event_loop"):
             self.event_loop()
 
-            if settings.game_state == "SIGN IN":
-                self.is_main_menu_music_playing = False
+        if settings.game_state == "SIGN IN":
+            self.is_main_menu_music_playing = False
 
-                self.sign_in_draw()
+            self.sign_in_draw()
 
-            elif settings.game_state == "MAIN MENU":
-                if not self.is_main_menu_music_playing:
-                    self.main_menu_music.play(-1)
-                    self.is_main_menu_music_playing = True
+        elif settings.game_state == "MAIN MENU":
+            if not self.is_main_menu_music_playing:  # Just got to the menu
+                assets.play_music(self.main_menu_music, volume=0.85)
+                self.is_main_menu_music_playing = True
+                self.is_leaderboard_outdated = True
 
+            # Also set when this process has written a score or synced
+            if self.is_leaderboard_outdated or perf_counter() - self.leaderboard_time > self.LEADERBOARD_REFRESH_INTERVAL:
                 self.update_leaderboard()
-                self.main_menu_draw()
+            self.main_menu_draw()
 
-            elif settings.game_state == "INTRO":
-                self.is_main_menu_music_playing = False
+        elif settings.game_state == "INTRO":
+            self.is_main_menu_music_playing = False
 
-                settings.game_state = self.game_mode1.intro_update()
-                self.game_mode1.intro_draw(settings.SCREEN)
+            settings.game_state = self.game_mode1.intro_update()
+            self.game_mode1.intro_draw(settings.SCREEN)
 
-            elif settings.game_state == "MIDDLE GAME":
-                self.is_main_menu_music_playing = False
+        elif settings.game_state == "MIDDLE GAME":
+            self.is_main_menu_music_playing = False
 
-                self.screen_sliding()
-                self.move_around()
+            self.screen_sliding()
+            self.move_around()
 
-                self.middle_game_draw()
+            self.middle_game_draw()
 
-            elif settings.game_state == "GAME OVER":
-                self.is_main_menu_music_playing = False
+        elif settings.game_state == "GAME OVER":
+            self.is_main_menu_music_playing = False
 
-                self.game_mode1.game_over_draw(settings.SCREEN)
+            self.game_mode1.game_over_draw(settings.SCREEN)
 
-            if not self.is_main_menu_music_playing:
-                self.main_menu_music.stop()
+        if not self.is_main_menu_music_playing:
+            assets.stop_music(self.main_menu_music)  # Leaves the other screens' tracks playing
 
+        profiler.draw_overlay(settings.SCREEN)
+
+        with profiler.stage("display.update"):
             pygame.display.update()
-            self.clock.tick(settings.FPS)  # Limits the FPS
+        self.clock.tick(settings.FPS)  # Limits the FPS
+
+        profiler.end_frame()
+        metrics.end_frame()
 
     def get_hovered_cell(self):
         mouse_coordinates = pygame.mouse.get_pos()
@@ -315,7 +291,7 @@ class Game:
         return mouse_pos
 
     def screen_sliding(self):
-        self.shift += Vector2(-1, 0) * self.SCREEN_SLIDING_SPEED
+        self.shift.x -= self.SCREEN_SLIDING_SPEED
 
     def move_around(self):
         self.shift += self.game_mode1.get_movement()
@@ -325,6 +301,11 @@ class Game:
             if event.type == pygame.QUIT:
                 self.quit_game()
 
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and profiler.enabled:
+                profiler.export()
+
             if settings.game_state == "SIGN IN":
                 self.sign_in_ui.update(event)
             elif settings.game_state == "MAIN MENU":
@@ -333,6 +314,11 @@ class Game:
                 self.game_mode1.game_over_update(event)
 
     def quit_game(self):
+        self.score_writer.close()  # Writes the scores that are still waiting
+        if self.score_sync is not None:
+            self.score_sync.close()  # Anything not sent yet stays in the outbox
+        if self.maintenance is not None:
+            self.maintenance.close()
         self.game_mode1.close()
         pygame.quit()
         sys_exit()
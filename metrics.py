@@ -0,0 +1,135 @@
+"""
+Counters and histograms for monitoring a fleet of kiosks, served in the Prometheus text format.
+
+Recording a sample is a few list and float operations and never takes a lock: every metric is only written by one
+thread (the frame loop, or the score writer for the database metrics), so a scrape at worst sees a sample that's
+half recorded. The HTTP server runs on a daemon thread and only reads. It's opt-in, see settings.METRICS_PORT, and
+only listens on settings.METRICS_HOST (the kiosk itself unless set otherwise).
+
+    curl http://127.0.0.1:9464/metrics
+"""
+
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+from time import perf_counter
+
+PREFIX = "muscle_survivors_"
+
+FRAME_BUCKETS = (0.008, 0.0167, 0.025, 0.0333, 0.05, 0.1, 0.25)
+POSE_BUCKETS = (0.005, 0.01, 0.02, 0.03, 0.05, 0.075, 0.1, 0.2)
+DB_WRITE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 2)
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = PREFIX + name
+        self.help_text = help_text
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def render(self):
+        return (f"# HELP {self.name} {self.help_text}\n"
+                f"# TYPE {self.name} counter\n"
+                f"{self.name} {self.value}\n")
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = PREFIX + name
+        self.help_text = help_text
+        self.buckets = buckets
+
+        self.counts = [0] * (len(buckets) + 1)  # The last one is for the values above every bucket
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+
+        counts = self.counts.copy()  # The recording thread can carry on meanwhile
+        n_values = 0
+        for bucket, count in zip((*self.buckets, "+Inf"), counts):
+            n_values += count
+            lines.append(f'{self.name}_bucket{{le="{bucket}"}} {n_values}')
+
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {n_values}")
+
+        return "\n".join(lines) + "\n"
+
+
+class Metrics:
+    def __init__(self):
+        self.frame_time = Histogram("frame_seconds", "Time between the starts of two frames.", FRAME_BUCKETS)
+        self.pose_latency = Histogram("pose_inference_seconds", "Time the pose model takes for one camera frame.",
+                                      POSE_BUCKETS)
+        self.camera_failures = Counter("camera_read_failures_total", "Camera reads that returned no frame.")
+        self.movement_samples = Counter("movement_samples_total", "Movement percentages read during a run.")
+        self.detection_dropouts = Counter("detection_dropouts_total",
+                                          "Movement percentages that were 0 because no body was detected.")
+        self.db_write_latency = Histogram("score_write_seconds", "Time to write and commit one batch of scores.",
+                                          DB_WRITE_BUCKETS)
+        self.db_write_failures = Counter("score_write_failures_total", "Scores that couldn't be written.")
+        self.video_frames_dropped = Counter("video_frames_dropped_total",
+                                            "Camera frames the video recorder dropped because it was behind.")
+
+        self.all = (self.frame_time, self.pose_latency, self.camera_failures, self.movement_samples,
+                    self.detection_dropouts, self.db_write_latency, self.db_write_failures, self.video_frames_dropped)
+
+        self.last_frame_end = None
+        self.server = None
+
+    def end_frame(self):
+        now = perf_counter()
+
+        if self.last_frame_end is not None:
+            self.frame_time.observe(now - self.last_frame_end)
+        self.last_frame_end = now
+
+    def render(self):
+        return "".join(metric.render() for metric in self.all)
+
+    def start_server(self, port, host="127.0.0.1"):
+        """
+        Serves /metrics on a daemon thread.
+        """
+
+        if self.server is not None:
+            return
+
+        self.server = HTTPServer((host, port), _MetricsHandler)
+        self.server.metrics = self
+        Thread(target=self.server.serve_forever, name="MetricsServer", daemon=True).start()
+
+    def stop_server(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = self.server.metrics.render().encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # Scrapes every few seconds would flood the console
+        pass
+
+
+metrics = Metrics()
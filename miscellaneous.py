@@ -1,7 +1,7 @@
 import time
 from os.path import join as path_join
 from math import floor
-import pygame.mixer
+from assets import assets
 
 
 class Timer:
@@ -16,8 +16,7 @@ class Timer:
         self.has_sound = has_sound
 
         self.last_count = None
-        self.counter_sfx = pygame.mixer.Sound(path_join("Music", "Counter SFX.wav"))
-        self.counter_sfx.set_volume(0.7)
+        self.counter_sfx = assets.get_sound(path_join("Music", "Counter SFX.wav"), volume=0.7)  # Shared by every Timer
 
     def start(self):
         if self.has_started:
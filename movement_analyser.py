@@ -1,17 +1,26 @@
 import cv2
 from mediapipe import solutions as mp_solutions
 import pygame
+from time import perf_counter
+from metrics import metrics
 
 
 class MovementAnalyser:
-    def __init__(self):
+    def __init__(self, camera=0):
+        """
+        camera is what cv2.VideoCapture opens. None opens no camera and loads no model, for the subclasses that get the
+        landmarks from somewhere else.
+        """
+
         # To make typing easier
         self.mp_draw = mp_solutions.drawing_utils
         self.mp_draw_styles = mp_solutions.drawing_styles
         self.mp_pose = mp_solutions.pose
-        self.pose = self.mp_pose.Pose(min_detection_confidence=0.7, min_tracking_confidence=0.7)
 
-        self.cap = cv2.VideoCapture(0)
+        self.pose = self.cap = None
+        if camera is not None:
+            self.pose = self.mp_pose.Pose(min_detection_confidence=0.7, min_tracking_confidence=0.7)
+            self.cap = cv2.VideoCapture(camera)
 
         self.up_shoulder_positions = self.up_elbow_positions = None
         self.down_shoulder_positions = self.down_elbow_positions = None
@@ -20,6 +29,8 @@ class MovementAnalyser:
 
         self.body_parts = []
 
+        self.video_recorder = None  # While a run is being recorded (see video_recorder.py)
+
     def get_up_positions(self):
         self.up_shoulder_positions = self.body_parts[11:13]
         self.up_elbow_positions = self.body_parts[13:15]
@@ -37,7 +48,7 @@ class MovementAnalyser:
         return sum(arr) / len(arr)
 
     def get_positions(self):
-        if not self.cap.isOpened():
+        if self.cap is None or not self.cap.isOpened():
             print("CAMERA IS OFF!")
             return
 
@@ -45,11 +56,17 @@ class MovementAnalyser:
 
         if not success:
             print("EMPTY CAMERA!")
+            metrics.camera_failures.inc()
             return
 
-        image = cv2.resize(image, (500, round(500/image.shape[1] * image.shape[0])))
-        image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
+        if self.video_recorder is not None:
+            self.video_recorder.push(image)  # The raw frame, before it's shrunk and mirrored
+
+        image = self.preprocess_image(image)
+
+        start = perf_counter()
         result = self.pose.process(image)
+        metrics.pose_latency.observe(perf_counter() - start)
 
         self.body_parts.clear()
 
@@ -65,6 +82,13 @@ class MovementAnalyser:
 
         return image
 
+    @staticmethod
+    def preprocess_image(image):
+        """Shrinks the camera frame to a width of 500, mirrors it and converts it to RGB for the Pose model."""
+
+        image = cv2.resize(image, (500, round(500/image.shape[1] * image.shape[0])))
+        return cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
+
     @staticmethod
     def show_camera_image(img):
         cv2.waitKey(1)
@@ -75,14 +99,17 @@ class MovementAnalyser:
     def convert_cv2_img_to_pygame_img(image):
         """CONVERTS CV2 Image to Pygame Image"""
 
-        return pygame.image.frombuffer(image.tostring(), image.shape[1::-1], "RGB")
+        return pygame.image.frombuffer(image.tobytes(), image.shape[1::-1], "RGB")
 
     @staticmethod
     def close_camera_window():
         cv2.destroyWindow("MUSCLE SURVIVORS")
 
     def get_movement_percentage(self):
+        metrics.movement_samples.inc()
+
         if not self.body_parts:  # If AI can't find the shoulders
+            metrics.detection_dropouts.inc()
             return 0
 
         mean_shoulder_y_now = self.get_mean(self.body_parts[11][-1], self.body_parts[12][-1])
@@ -104,6 +131,8 @@ class MovementAnalyser:
         self.body_parts = []
 
     def close_analyser(self):
-        self.cap.release()
-        self.pose.close()
+        if self.cap is not None:
+            self.cap.release()
+        if self.pose is not None:
+            self.pose.close()
 
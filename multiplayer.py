@@ -0,0 +1,313 @@
+"""
+Split-screen GameMode1 for two or more players side by side. Each player gets a viewport of the screen with their own
+Grid, obstacles and calibration, and their own PoseWorker process, so the Pose model of every player runs on its own
+core (see pose_worker.py).
+
+Everyone calibrates at the same time and the run starts once all of them are done, with the same obstacles for
+everyone. The last one standing wins. Multiplayer runs aren't saved to the leaderboards.
+
+Usage:
+    python multiplayer.py --players 2 --cameras 0 1                  A camera for each player
+    python multiplayer.py --players 2 --shared-camera 0              One wide camera, each player stands in their half
+    python multiplayer.py --players 3 --shared-camera workout.mp4 --difficulty HARD --window-size 1920 1080
+"""
+
+import argparse
+import random
+from sys import exit as sys_exit
+from time import perf_counter
+import pygame
+from pygame import Vector2
+import settings
+import UI
+from grid import Grid
+from game_mode1 import GameMode1
+from pose_worker import PoseWorker, SharedCamera, WorkerMovementAnalyser
+from resolution_scaler import ResolutionScaler
+from assets import assets
+from profiler import profiler
+from metrics import metrics
+
+PLAYER_COLORS = ("#75a743", "#4f8fba", "#de9e41", "#a23e8c")
+
+
+class SplitScreenPlayer(GameMode1):
+    def __init__(self, player_n, screen, viewport, tile_size, difficulty, movement_analyser, render_time_budget):
+        grid = Grid("GRAY", tile_size, size=viewport.size)
+        super().__init__(grid, difficulty, movement_analyser)
+
+        self.name = f"PLAYER {player_n + 1}"
+        self.color = PLAYER_COLORS[player_n % len(PLAYER_COLORS)]
+        self.player.color = self.color
+        self.viewport = viewport
+        self.surface = screen.subsurface(viewport)  # Drawing on it draws on the screen, clipped to the viewport
+
+        self.resolution_scaler = ResolutionScaler(viewport.size, settings.RENDER_SCALES, render_time_budget)
+
+        self.shift = Vector2(0, 0)
+        self.is_calibrated = False
+        self.is_alive = True
+        self.score = 0
+
+    def calibrate_update(self):
+        if not self.is_calibrated:
+            self.is_calibrated = self.calibrate()
+
+    def calibration_draw(self):
+        surface = self.surface
+        center_x = self.viewport.width / 2
+
+        surface.fill("#ebede9")
+        UI.put_text(surface, text=self.name, font_size=60, pos=(center_x, 40), anchor="MIDTOP", color=self.color,
+                    is_underlined=True)
+
+        if self.is_calibrated:
+            UI.put_text(surface, text="READY!", pos=(center_x, 140), anchor="MIDTOP", is_bold=True)
+            UI.put_text(surface, text="Waiting for the others...", font_size=35, pos=(center_x, 200), anchor="MIDTOP")
+        else:
+            timer = self.up_timer if self.intro_check_text == "UP!" else self.down_timer
+            UI.put_text(surface, text=self.intro_check_text, pos=(center_x, 140), anchor="MIDTOP", is_bold=True)
+            UI.put_text(surface, text=f"{timer.get_time(True)}s", pos=(center_x, 200), anchor="MIDTOP")
+
+        if self.movement_image is not None:
+            image = self.movement_image
+            if image.get_width() > self.viewport.width * 0.9:
+                image = pygame.transform.smoothscale_by(image, self.viewport.width * 0.9 / image.get_width())
+
+            surface.blit(image, image.get_rect(midtop=(center_x, 280)))
+
+    def start_multiplayer_run(self, seed):
+        self.movement_analyser.is_preview_shown = False  # Only the calibration screen shows it
+        self.rng = random.Random(seed)
+        self.rep_counter.reset()
+        self.game_timer.start()
+
+    def middle_game_update(self):
+        """
+        Moves, draws and steps the player for one frame. Returns True if they've just hit an obstacle.
+        """
+
+        self.shift.x -= self.SCREEN_SLIDING_SPEED
+        self.shift += self.get_movement()
+
+        self.grid.update(self.shift)
+
+        render_start = perf_counter()
+        surface = self.resolution_scaler.get_surface(self.surface)
+        scale = self.resolution_scaler.scale
+
+        surface.fill("#ebede9")
+        self.grid.draw(surface, scale)
+        self.draw_world(surface, scale)
+        self.resolution_scaler.present(self.surface)
+
+        if settings.DYNAMIC_RESOLUTION:
+            self.resolution_scaler.record(perf_counter() - render_start)
+
+        self.draw_hud(self.surface)
+        UI.put_text(self.surface, text=self.name, font_size=40, pos=(self.viewport.width - 30, 30), anchor="TOPRIGHT",
+                    color=self.color)
+
+        if not self.step():
+            return False
+
+        self.is_alive = False
+        self.score = self.game_timer.get_time()
+        self.death_sfx.play()
+
+        return True
+
+    def out_draw(self):
+        self.surface.fill((255, 75, 75))
+        UI.put_text(self.surface, text=self.name, font_size=60, pos=(self.viewport.width / 2, 40), anchor="MIDTOP",
+                    is_underlined=True)
+        UI.put_text(self.surface, text=f"OUT! {self.score}s", pos=(self.viewport.width / 2, 140), anchor="MIDTOP")
+
+    def restart_multiplayer(self):
+        self.restart_game()
+        self.player.color = self.color  # reset_rules() made a new one
+        self.movement_analyser.is_preview_shown = True
+
+        self.shift.update(0, 0)
+        self.is_calibrated = False
+        self.is_alive = True
+        self.score = 0
+
+
+class MultiplayerGame:
+    def __init__(self, n_players=2, difficulty="EASY", cameras=None, shared_camera=None, camera_size=(1280, 720),
+                 window_size=None):
+        """
+        cameras has a camera index (or a video file) for each player. Without it, every player gets a slice of
+        shared_camera.
+        """
+
+        pygame.init()
+
+        if window_size:
+            settings.SCREEN = pygame.display.set_mode(window_size)
+        else:
+            settings.SCREEN = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        settings.WINDOW_SIZE = settings.SCREEN.get_size()
+        pygame.display.set_caption(f"{settings.WINDOW_CAPTION} - {n_players} PLAYERS")
+
+        self.clock = pygame.time.Clock()
+
+        self.shared_camera = None
+        if not cameras:
+            self.shared_camera = SharedCamera(shared_camera if shared_camera is not None else 0, camera_size)
+
+        viewport_width = settings.WINDOW_SIZE[0] // n_players
+        tile_size = (settings.WINDOW_SIZE[1] // 10, settings.WINDOW_SIZE[1] // 10)
+
+        self.players = []
+        for i in range(n_players):
+            if self.shared_camera is not None:
+                worker = PoseWorker(crop=(i / n_players, (i + 1) / n_players), shared_camera=self.shared_camera)
+            else:
+                worker = PoseWorker(cameras[i])
+
+            viewport = pygame.Rect(i * viewport_width, 0, viewport_width, settings.WINDOW_SIZE[1])
+            self.players.append(SplitScreenPlayer(i, settings.SCREEN, viewport, tile_size, difficulty,
+                                                  WorkerMovementAnalyser(worker),
+                                                  settings.RENDER_TIME_BUDGET / n_players))
+
+        self.state = "INTRO"
+        self.winner_text = ""
+
+        self.middle_game_music = self.players[0].middle_game_music
+
+        self.game_over_buttons = pygame.sprite.Group()
+        self.game_over_buttons.add(UI.Button(None, (settings.WINDOW_SIZE[0]/2, settings.WINDOW_SIZE[1]/2 + 100),
+                                             self.restart, height=75, width=350, font_size=55, text="PLAY AGAIN!"))
+        self.game_over_buttons.add(UI.Button(None, (settings.WINDOW_SIZE[0]/2, settings.WINDOW_SIZE[1]/2 + 250),
+                                             self.quit_game, height=75, width=350, font_size=55, text="QUIT!"))
+
+    def intro_update(self):
+        for player in self.players:
+            player.calibrate_update()
+            player.calibration_draw()
+
+        if all(player.is_calibrated for player in self.players):
+            seed = random.randrange(2 ** 63)  # Everyone gets the same obstacles
+            for player in self.players:
+                player.start_multiplayer_run(seed)
+
+            assets.play_music(self.middle_game_music, volume=0.3)
+            self.state = "MIDDLE GAME"
+
+    def middle_game_update(self):
+        for player in self.players:
+            if player.is_alive:
+                with profiler.stage("GameMode1.draw"):
+                    player.middle_game_update()
+            else:
+                player.out_draw()
+
+        if not any(player.is_alive for player in self.players):
+            assets.stop_music(self.middle_game_music)
+
+            best_score = max(player.score for player in self.players)
+            winners = [player.name for player in self.players if player.score == best_score]
+            self.winner_text = f"{' & '.join(winners)} {'WINS' if len(winners) == 1 else 'WIN'}! ({best_score}s)"
+
+            self.state = "GAME OVER"
+
+    def game_over_draw(self):
+        screen = settings.SCREEN
+        screen.fill((255, 75, 75))
+
+        UI.put_text(screen, is_underlined=True, text="GAME OVER!", font_size=120,
+                    pos=(settings.WINDOW_SIZE[0]/2, settings.WINDOW_SIZE[1] // 2 - 350), anchor="MIDTOP")
+        UI.put_text(screen, text=self.winner_text, pos=(settings.WINDOW_SIZE[0]/2, settings.WINDOW_SIZE[1] // 2 - 200),
+                    anchor="MIDTOP")
+
+        for player in self.players:
+            UI.put_text(screen, text=f"{player.name}: {player.score}s, {player.rep_counter.n_reps} reps", font_size=40, color=player.color,
+                        pos=(player.viewport.centerx, settings.WINDOW_SIZE[1] // 2 - 100), anchor="MIDTOP")
+
+        self.game_over_buttons.draw(screen)
+
+    def draw_viewport_borders(self):
+        for player in self.players[1:]:
+            pygame.draw.line(settings.SCREEN, "#090a14", player.viewport.topleft, player.viewport.bottomleft, 4)
+
+    def restart(self):
+        for player in self.players:
+            player.restart_multiplayer()
+
+        self.state = "INTRO"
+
+    def main_loop(self):
+        while True:
+            with profiler.stage("event_loop"):
+                self.event_loop()
+
+            if self.state == "INTRO":
+                self.intro_update()
+                self.draw_viewport_borders()
+
+            elif self.state == "MIDDLE GAME":
+                self.middle_game_update()
+                self.draw_viewport_borders()
+
+            elif self.state == "GAME OVER":
+                self.game_over_draw()
+
+            profiler.draw_overlay(settings.SCREEN)
+
+            with profiler.stage("display.update"):
+                pygame.display.update()
+            self.clock.tick(settings.FPS)
+
+            profiler.end_frame()
+            metrics.end_frame()
+
+    def event_loop(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                self.quit_game()
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+
+            if self.state == "GAME OVER":
+                self.game_over_buttons.update(event)
+
+    def close(self):
+        for player in self.players:
+            player.close()  # Stops the player's worker
+
+        if self.shared_camera is not None:
+            self.shared_camera.close()
+
+    def quit_game(self):
+        self.close()
+        pygame.quit()
+        sys_exit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays MUSCLE SURVIVORS split-screen.")
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--difficulty", default="EASY", choices=("EASY", "NORMAL", "HARD"))
+    parser.add_argument("--cameras", nargs="+", help="A camera index or video file for each player")
+    parser.add_argument("--shared-camera", default="0", help="The camera index or video file the players share")
+    parser.add_argument("--camera-size", type=int, nargs=2, default=(1280, 720))
+    parser.add_argument("--window-size", type=int, nargs=2, help="Plays in a window instead of fullscreen")
+    args = parser.parse_args()
+
+    if args.cameras and len(args.cameras) != args.players:
+        parser.error("--cameras needs a camera for each player")
+
+    def to_source(camera):  # Camera indices are numbers, anything else is a video file
+        return int(camera) if camera.isdigit() else camera
+
+    cameras = [to_source(camera) for camera in args.cameras] if args.cameras else None
+    game = MultiplayerGame(args.players, args.difficulty, cameras, to_source(args.shared_camera), args.camera_size,
+                           args.window_size)
+    game.main_loop()
+
+
+if __name__ == "__main__":
+    main()
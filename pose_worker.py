@@ -0,0 +1,284 @@
+"""
+Runs a player's camera and Pose model in a process of its own, so every player's inference gets a core and the frame
+loop never waits for the model.
+
+The worker keeps reading frames and publishes the landmarks of the latest one (and the camera image with them drawn
+on, for the intro screen) in shared memory. WorkerMovementAnalyser picks up whatever is newest when the rules ask for
+the player's position.
+
+Players can have a camera each, or share one wide camera: a SharedCamera process then captures the frames into shared
+memory and each player's worker crops its own slice of them.
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory
+from time import perf_counter_ns, sleep
+import cv2
+from mediapipe import solutions as mp_solutions
+import numpy as np
+from movement_analyser import MovementAnalyser
+from metrics import metrics
+
+N_LANDMARKS = 33
+PREVIEW_WIDTH = 500  # MovementAnalyser.preprocess_image shrinks every frame to this width
+PREVIEW_MAX_HEIGHT = 1000  # Taller previews (crops narrower than 1:2) are cut off at the bottom
+
+# seq (incremented with every result), landmarks found (0 or N_LANDMARKS), camera failures, latency (ns), preview height
+SEQ, N_FOUND, N_FAILURES, LATENCY, PREVIEW_HEIGHT = range(5)
+HEADER_SIZE = 5
+
+
+class FrameBuffer:
+    """
+    The latest frame of a SharedCamera, in shared memory. It's handed to the worker processes when they start.
+    """
+
+    def __init__(self, size):
+        self.shape = (size[1], size[0], 3)
+        self.memory = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)))
+        self.lock = multiprocessing.Lock()
+        self.frame_n = multiprocessing.Value("Q", 0, lock=False)  # Only written under self.lock
+
+    @property
+    def frame(self):
+        return np.ndarray(self.shape, np.uint8, self.memory.buf)
+
+
+class SharedCamera:
+    """
+    Captures one camera for several players. size is the frame size the workers get, frames of any other size are
+    resized to it.
+    """
+
+    def __init__(self, camera=0, size=(1280, 720)):
+        self.frame_buffer = FrameBuffer(size)
+        self.stop_event = multiprocessing.Event()
+
+        self.process = multiprocessing.Process(target=run_shared_camera, args=(camera, self.frame_buffer,
+                                                                                self.stop_event),
+                                               name="SharedCamera", daemon=True)
+        self.process.start()
+
+    def close(self):
+        self.stop_event.set()
+        self.process.join(2)
+        if self.process.is_alive():
+            self.process.terminate()
+
+        self.frame_buffer.memory.close()
+        self.frame_buffer.memory.unlink()
+
+
+class PoseWorker:
+    def __init__(self, camera=0, crop=None, shared_camera=None):
+        """
+        camera is a camera index or a video file. With a shared_camera, crop is the (left, right) share of the mirrored
+        image the player stands in, e.g. (0, 0.5) for the left half of the screen.
+        """
+
+        self.memory = shared_memory.SharedMemory(create=True, size=get_result_size())
+        self.header, self.landmarks, self.preview = get_result_arrays(self.memory)
+        self.header[:] = 0
+
+        self.lock = multiprocessing.Lock()
+        self.stop_event = multiprocessing.Event()
+
+        frame_buffer = shared_camera.frame_buffer if shared_camera is not None else None
+        self.process = multiprocessing.Process(target=run_worker, args=(camera, crop, frame_buffer, self.memory.name,
+                                                                        self.lock, self.stop_event),
+                                               name="PoseWorker", daemon=True)
+        self.process.start()
+
+    def read(self, last_seq, landmarks, preview=None):
+        """
+        Copies the latest result into landmarks, and into preview unless it's None. Returns its header as a list, or
+        None if there's nothing newer than last_seq.
+        """
+
+        with self.lock:
+            if self.header[SEQ] == last_seq:
+                return None
+
+            header = self.header.tolist()
+            landmarks[:] = self.landmarks
+            if preview is not None:
+                preview[:header[PREVIEW_HEIGHT]] = self.preview[:header[PREVIEW_HEIGHT]]
+
+        return header
+
+    def close(self):
+        self.stop_event.set()
+        self.process.join(2)
+        if self.process.is_alive():
+            self.process.terminate()
+
+        del self.header, self.landmarks, self.preview  # The memory can't be closed while they point into it
+        self.memory.close()
+        self.memory.unlink()
+
+
+class WorkerMovementAnalyser(MovementAnalyser):
+    """
+    A MovementAnalyser whose camera and model are in a PoseWorker. get_positions() never waits: until the worker has
+    something newer, the player keeps the last landmarks it found.
+
+    The preview image is only copied out of the worker while is_preview_shown is set (the calibration screen). During
+    a run get_positions() returns None and only the landmarks are copied.
+    """
+
+    def __init__(self, worker):
+        super().__init__(camera=None)
+
+        self.worker = worker
+
+        self.last_seq = 0
+        self.n_camera_failures = 0
+        self.landmarks = np.zeros((N_LANDMARKS, 2), np.int32)
+        self.preview = np.zeros((PREVIEW_MAX_HEIGHT, PREVIEW_WIDTH, 3), np.uint8)
+        self.preview_height = 0
+        self.is_preview_shown = True
+
+    def get_positions(self):
+        header = self.worker.read(self.last_seq, self.landmarks, self.preview if self.is_preview_shown else None)
+
+        if header is not None:
+            self.last_seq = header[SEQ]
+            if self.is_preview_shown:
+                self.preview_height = header[PREVIEW_HEIGHT]
+
+            metrics.pose_latency.observe(header[LATENCY] / 1e9)
+            metrics.camera_failures.inc(header[N_FAILURES] - self.n_camera_failures)
+            self.n_camera_failures = header[N_FAILURES]
+
+            self.body_parts.clear()
+            for id, (X, Y) in enumerate(self.landmarks.tolist()[:header[N_FOUND]]):
+                self.body_parts.append([id, X, Y])
+
+        if not self.is_preview_shown or not self.preview_height:
+            return None
+
+        return self.preview[:self.preview_height]
+
+    def close_analyser(self):
+        self.worker.close()
+
+
+def get_result_size():
+    return (HEADER_SIZE * 8) + (N_LANDMARKS * 2 * 4) + (PREVIEW_MAX_HEIGHT * PREVIEW_WIDTH * 3)
+
+
+def get_result_arrays(memory):
+    """
+    header, landmarks and preview, as views of the result memory.
+    """
+
+    header = np.ndarray((HEADER_SIZE,), np.int64, memory.buf)
+    landmarks = np.ndarray((N_LANDMARKS, 2), np.int32, memory.buf, offset=header.nbytes)
+    preview = np.ndarray((PREVIEW_MAX_HEIGHT, PREVIEW_WIDTH, 3), np.uint8, memory.buf,
+                         offset=header.nbytes + landmarks.nbytes)
+
+    return header, landmarks, preview
+
+
+def open_capture(camera):
+    capture = cv2.VideoCapture(camera)
+    if not capture.isOpened():
+        print(f"COULDN'T OPEN CAMERA {camera}!")
+
+    return capture
+
+
+def run_shared_camera(camera, frame_buffer, stop_event):
+    capture = open_capture(camera)
+    frame = frame_buffer.frame
+
+    while not stop_event.is_set():
+        success, image = capture.read()
+
+        if not success:
+            if isinstance(camera, str):  # A video file has ended, it's played again
+                capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            else:
+                sleep(0.01)
+            continue
+
+        if image.shape != frame.shape:
+            image = cv2.resize(image, frame.shape[1::-1])
+
+        with frame_buffer.lock:
+            frame[:] = image
+            frame_buffer.frame_n.value += 1
+
+    capture.release()
+    del frame
+    frame_buffer.memory.close()
+
+
+def run_worker(camera, crop, frame_buffer, result_name, lock, stop_event):
+    cv2.setNumThreads(1)  # Every player has a process already, more threads would only fight over the cores
+
+    mp_pose = mp_solutions.pose
+    pose = mp_pose.Pose(min_detection_confidence=0.7, min_tracking_confidence=0.7)
+
+    memory = shared_memory.SharedMemory(name=result_name)
+    header, landmarks, preview = get_result_arrays(memory)
+    found_landmarks = np.zeros_like(landmarks)
+
+    capture = open_capture(camera) if frame_buffer is None else None
+    last_frame_n = 0
+    n_failures = 0
+
+    while not stop_event.is_set():
+        if frame_buffer is None:
+            success, image = capture.read()
+
+            if not success:
+                n_failures += 1
+                if isinstance(camera, str):
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                else:
+                    sleep(0.01)
+                continue
+        else:
+            if frame_buffer.frame_n.value == last_frame_n:  # Waits for a frame it hasn't seen
+                sleep(0.002)
+                continue
+
+            with frame_buffer.lock:
+                last_frame_n = frame_buffer.frame_n.value
+                width = frame_buffer.shape[1]
+                # The crop is in the mirrored image, the frame isn't mirrored yet
+                image = frame_buffer.frame[:, round(width * (1 - crop[1])):round(width * (1 - crop[0]))].copy()
+
+        image = MovementAnalyser.preprocess_image(image)
+
+        start = perf_counter_ns()
+        result = pose.process(image)
+        latency = perf_counter_ns() - start
+
+        n_found = 0
+        if result.pose_landmarks:
+            mp_solutions.drawing_utils.draw_landmarks(image, result.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+
+            h, w, _ = image.shape
+            for id, im in enumerate(result.pose_landmarks.landmark):
+                found_landmarks[id] = int(im.x * w), int(im.y * h)
+            n_found = N_LANDMARKS
+
+        preview_height = min(image.shape[0], PREVIEW_MAX_HEIGHT)
+
+        with lock:
+            preview[:preview_height] = image[:preview_height]
+            landmarks[:] = found_landmarks
+            header[N_FOUND] = n_found
+            header[N_FAILURES] = n_failures
+            header[LATENCY] = latency
+            header[PREVIEW_HEIGHT] = preview_height
+            header[SEQ] += 1
+
+    if capture is not None:
+        capture.release()
+    pose.close()
+
+    del header, landmarks, preview
+    memory.close()
@@ -0,0 +1,182 @@
+"""
+Per-stage frame timings with an on-screen overlay and CSV/JSON export.
+
+Wrap a stage with "with profiler.stage(name):". While the profiler is disabled stage() hands back a shared context
+manager that does nothing, so leaving the timers in the game loop costs next to nothing. Every name has to be in
+STAGES: an unknown one raises straight away, even while the profiler is disabled, not only once F3 turns it on.
+F3 toggles the profiler and its overlay, F4 exports the recorded frames to settings.PROFILE_EXPORT_PATH.
+"""
+
+import csv
+import json
+from time import perf_counter
+import numpy as np
+import pygame
+import settings
+import UI
+
+STAGES = ("event_loop", "Grid.update", "Grid.draw", "GameMode1.draw", "present", "check_collisions", "get_positions",
+          "display.update", "frame")
+PERCENTILES = (50, 95, 99)
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.current[self.name] += perf_counter() - self.start
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class FrameProfiler:
+    def __init__(self, n_frames=600, enabled=False, overlay_refresh_n_frames=30):
+        self.n_frames = n_frames
+        self.enabled = enabled
+        self.overlay_refresh_n_frames = overlay_refresh_n_frames
+
+        self.stages = {name: _Stage(self, name) for name in STAGES}
+        self.current = dict.fromkeys(STAGES, 0.0)
+        self.buffers = {name: np.zeros(n_frames) for name in STAGES}  # Ring buffers of seconds per frame
+
+        self.frame_n = 0
+        self.last_frame_end = None
+
+        self.overlay_image = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.reset()
+
+    def reset(self):
+        for name in STAGES:
+            self.current[name] = 0.0
+            self.buffers[name][:] = 0
+
+        self.frame_n = 0
+        self.last_frame_end = None
+        self.overlay_image = None
+
+    def stage(self, name):
+        try:
+            stage = self.stages[name]
+        except KeyError:
+            raise KeyError(f"{name!r} isn't a profiler stage, add it to profiler.STAGES") from None
+
+        return stage if self.enabled else NULL_STAGE
+
+    def end_frame(self):
+        """
+        Stores the stage timings of the frame that just ended in the ring buffers.
+        """
+
+        if not self.enabled:
+            return
+
+        now = perf_counter()
+        if self.last_frame_end is not None:
+            self.current["frame"] = now - self.last_frame_end
+        self.last_frame_end = now
+
+        i = self.frame_n % self.n_frames
+        for name in STAGES:
+            self.buffers[name][i] = self.current[name]
+            self.current[name] = 0.0
+
+        self.frame_n += 1
+
+        if self.frame_n % self.overlay_refresh_n_frames == 0:
+            self.overlay_image = None
+
+    def get_frames(self, name):
+        """
+        Returns the recorded timings of a stage, oldest frame first.
+        """
+
+        if self.frame_n <= self.n_frames:
+            return self.buffers[name][:self.frame_n]
+
+        i = self.frame_n % self.n_frames
+        return np.concatenate((self.buffers[name][i:], self.buffers[name][:i]))
+
+    def get_summary(self):
+        """
+        Returns {stage: {"p50": ms, "p95": ms, "p99": ms}}.
+        """
+
+        summary = {}
+
+        for name in STAGES:
+            frames = self.get_frames(name)
+            values = np.percentile(frames, PERCENTILES) * 1000 if len(frames) else [0] * len(PERCENTILES)
+            summary[name] = {f"p{p}": float(value) for p, value in zip(PERCENTILES, values)}
+
+        return summary
+
+    def prepare_overlay(self):
+        lines = [f"{'STAGE':<18}" + "".join(f"{f'p{p}':>9}" for p in PERCENTILES)]
+        lines += [f"{name:<18}" + "".join(f"{value:>7.2f}ms" for value in stage.values())
+                  for name, stage in self.get_summary().items()]
+
+        line_height = 20
+        self.overlay_image = pygame.Surface((470, line_height * len(lines) + 10), pygame.SRCALPHA)
+        self.overlay_image.fill((0, 0, 0, 170))
+
+        font_path = pygame.font.match_font("consolas,dejavusansmono,monospace")
+
+        for i, line in enumerate(lines):
+            UI.put_text(self.overlay_image, font_path=font_path, font_size=16, pos=(8, 5 + i * line_height), anchor="TOPLEFT", color=(255, 255, 255), text=line)
+
+    def draw_overlay(self, screen):
+        if not self.enabled:
+            return
+
+        if self.overlay_image is None:
+            self.prepare_overlay()
+
+        screen.blit(self.overlay_image, self.overlay_image.get_rect(topright=(screen.get_width() - 10, 150)))
+
+    def export(self, path=None):
+        """
+        Writes the recorded frames to a .csv file (one row per frame, milliseconds) or to a .json file (percentiles
+        and every frame).
+        """
+
+        path = path or settings.PROFILE_EXPORT_PATH
+        frames = {name: (self.get_frames(name) * 1000).tolist() for name in STAGES}
+
+        if path.endswith(".json"):
+            with open(path, "w") as file:
+                json.dump({"summary": self.get_summary(), "frames": frames}, file, indent=2)
+        else:
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(("frame_n", *STAGES))
+                first_frame_n = self.frame_n - len(frames["frame"])
+
+                for i, row in enumerate(zip(*frames.values())):
+                    writer.writerow((first_frame_n + i, *(f"{value:.4f}" for value in row)))
+
+        return path
+
+
+profiler = FrameProfiler(enabled=settings.PROFILING)
@@ -0,0 +1,129 @@
+"""
+Counts push-up reps from the movement percentage as it comes in, and keeps a downsampled copy of the signal for the
+workouts table.
+
+The percentage is already calibrated on the player's own UP! and DOWN! shoulder heights (see GameMode1.calibrate): 1
+is the UP! pose and -1 the DOWN! pose. A rep is going below down_threshold
+and then back above up_threshold. The gap between the two thresholds (hysteresis) keeps a signal that jitters around
+one of them from counting extra reps, and a frame where the body isn't found (a percentage of 0) can't start or
+finish one.
+
+Counting keeps a constant amount of state. What grows with the run is the output: 4 bytes per rep and 1 byte per
+1/signal_rate seconds of signal.
+"""
+
+import sys
+from array import array
+from time import perf_counter
+
+
+class RepCounter:
+    def __init__(self, up_threshold=0.5, down_threshold=-0.5, signal_rate=10):
+        self.up_threshold = up_threshold
+        self.down_threshold = down_threshold
+        self.signal_rate = signal_rate
+
+        self.start_time = 0
+        self.is_down = False
+        self.n_reps = 0
+        self.rep_times = array("I")  # In milliseconds since the start
+
+        self.signal = array("b")  # The mean percentage of every 1/signal_rate seconds, times 127
+        self.slot = 0
+        self.slot_sum = 0
+        self.slot_n = 0
+
+        self.reset()
+
+    def reset(self):
+        """
+        Starts counting again from now.
+        """
+
+        self.start_time = perf_counter()
+        self.is_down = False
+        self.n_reps = 0
+        self.rep_times = array("I")
+
+        self.signal = array("b")
+        self.slot = 0
+        self.slot_sum = 0
+        self.slot_n = 0
+
+    def add(self, percentage, time=None):
+        """
+        time is in seconds since the start, now by default. Returns True if the sample has finished a rep.
+        """
+
+        if time is None:
+            time = perf_counter() - self.start_time
+
+        slot = int(time * self.signal_rate)
+        if slot != self.slot:
+            self.close_slot(slot)
+        self.slot_sum += percentage
+        self.slot_n += 1
+
+        if not self.is_down:
+            self.is_down = percentage <= self.down_threshold
+            return False
+
+        if percentage < self.up_threshold:
+            return False
+
+        self.is_down = False
+        self.n_reps += 1
+        self.rep_times.append(round(time * 1000))
+
+        return True
+
+    def close_slot(self, next_slot):
+        """
+        Adds the mean of the current slot to the signal, and repeats it for the slots no sample fell into.
+        """
+
+        value = round(127 * self.slot_sum / self.slot_n) if self.slot_n else 0
+        for _ in range(self.slot, next_slot):
+            self.signal.append(max(-127, min(127, value)))
+
+        self.slot = next_slot
+        self.slot_sum = 0
+        self.slot_n = 0
+
+    def finish(self):
+        """
+        Returns the rep times and the signal as little-endian bytes, for database.insert_workout.
+        """
+
+        if self.slot_n:
+            self.close_slot(self.slot + 1)
+
+        return to_little_endian(self.rep_times), self.signal.tobytes()
+
+
+def to_little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    return values.tobytes()
+
+
+def decode_rep_times(blob):
+    """
+    The rep times of a workout in seconds.
+    """
+
+    rep_times = array("I", blob)
+    if sys.byteorder == "big":
+        rep_times.byteswap()
+
+    return [rep_time / 1000 for rep_time in rep_times]
+
+
+def decode_signal(blob):
+    """
+    The downsampled percentages of a workout, from -1 to 1.
+    """
+
+    return [value / 127 for value in array("b", blob)]
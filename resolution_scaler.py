@@ -0,0 +1,78 @@
+"""
+Dynamic resolution for the game world. When drawing the world takes longer than the budget, it's drawn to a smaller
+surface that is scaled up to the display; when there's time to spare it goes back up. The grid and the rules keep
+working in display (logical) coordinates, only the drawing multiplies them by the scale.
+
+The scales are tried in order. Scaling up costs time too (an exact halving is by far the cheapest), so the time of a
+frame includes it, and a scale that was already measured to be slower isn't stepped down to.
+"""
+
+import pygame
+
+
+class ResolutionScaler:
+    def __init__(self, display_size, scales=(1.0, 0.75, 0.5), budget=0.008, window=30, retry_after=20):
+        """
+        budget is in seconds per frame. The average over each window frames decides whether to change scale. A scale
+        that was too slow is tried again after retry_after windows.
+        """
+
+        self.display_size = display_size
+        self.scales = scales
+        self.budget = budget
+        self.window = window
+        self.retry_after = retry_after
+
+        self.level = 0
+        self.surfaces = {}
+
+        self.render_times = []
+        self.n_windows = 0
+        self.level_times = {}  # Level -> average render time the last time it was used
+        self.left_at = {}  # Level -> the window it was stepped down from
+
+    @property
+    def scale(self):
+        return self.scales[self.level]
+
+    def get_surface(self, screen):
+        """
+        The surface to draw the world on this frame. At full scale it's the screen itself.
+        """
+
+        if self.scale == 1:
+            return screen
+
+        if self.level not in self.surfaces:
+            size = (round(self.display_size[0] * self.scale), round(self.display_size[1] * self.scale))
+            self.surfaces[self.level] = pygame.Surface(size).convert(screen)  # Same pixel format scales fastest
+
+        return self.surfaces[self.level]
+
+    def present(self, screen):
+        if self.scale != 1:
+            pygame.transform.scale(self.surfaces[self.level], self.display_size, screen)
+
+    def record(self, render_time):
+        self.render_times.append(render_time)
+
+        if len(self.render_times) < self.window:
+            return
+
+        mean = sum(self.render_times) / len(self.render_times)
+        self.render_times.clear()
+        self.n_windows += 1
+        self.level_times[self.level] = mean
+
+        if mean > self.budget:
+            lower = self.level + 1
+
+            if lower < len(self.scales) and self.level_times.get(lower, 0) < mean:
+                self.left_at[self.level] = self.n_windows
+                self.level = lower
+
+        elif self.level > 0:
+            upper = self.level - 1
+
+            if self.level_times[upper] <= self.budget or self.n_windows - self.left_at[upper] >= self.retry_after:
+                self.level = upper
@@ -0,0 +1,231 @@
+"""
+Keeps this kiosk's scores in sync with a shared leaderboard service, on an asyncio loop in a background thread, so
+the game never waits on the network.
+
+New scores are queued in the syncOutbox table by a trigger, so the queue survives restarts and being offline. The
+client posts them in batches and deletes them once the service has acknowledged them, then pulls the merged top
+scores of every kiosk into the remoteLeaderboard table. A failed request is retried after an exponentially growing,
+jittered delay. The service dedupes on (kiosk, id), so a batch sent again after a lost response isn't counted twice.
+
+Protocol (JSON over HTTP/1.1, one request per connection):
+    POST /scores               {"kiosk": "...", "scores": [[id, playerName, difficulty, score, playedAt], ...]}
+    GET  /leaderboards?n=10 -> {"EASY": [[playerName, score], ...], "NORMAL": [...], ...}
+
+leaderboard_server.py is a stand-in for the service. Usage:
+    python score_sync.py http://127.0.0.1:8765 [--once]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+from threading import Thread
+from urllib.parse import urlsplit
+import database
+
+
+class SyncError(Exception):
+    pass
+
+
+# What a failed or garbled request raises, or a database that stayed locked past retry_on_busy
+SYNC_ERRORS = (OSError, asyncio.TimeoutError, SyncError, ValueError, sqlite3.Error)
+
+
+class ScoreSync:
+    def __init__(self, url, on_update=None, interval=10, batch_size=100, timeout=5, max_backoff=120,
+                 leaderboard_size=database.LEADERBOARD_SIZE):
+        """
+        on_update is called from the sync thread whenever the cached leaderboards have changed.
+        """
+
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = parts.scheme == "https"
+        self.base_path = parts.path.rstrip("/")
+
+        self.on_update = on_update
+        self.interval = interval
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.leaderboard_size = leaderboard_size
+
+        self.kiosk_id = database.enable_score_sync()
+
+        self.is_online = False
+        self.n_failures = 0
+        self.is_stopping = False
+
+        self.loop = None
+        self.wake = None
+        self.thread = None
+
+    def start(self):
+        self.thread = Thread(target=asyncio.run, args=(self.run(),), name="ScoreSync", daemon=True)
+        self.thread.start()
+
+    def notify(self):
+        """
+        Asks for a sync now, e.g. right after a score has been written. Safe to call from any thread. It doesn't cut
+        a backoff short.
+        """
+
+        loop = self.loop
+        if loop is None:
+            return
+
+        try:
+            loop.call_soon_threadsafe(self.wake.set)
+        except RuntimeError:  # The loop has already finished
+            pass
+
+    def close(self, timeout=2):
+        """
+        Stops the thread. Scores that haven't been sent stay in the outbox for the next start.
+        """
+
+        self.is_stopping = True
+        self.notify()
+
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    async def run(self):
+        self.wake = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+
+        while not self.is_stopping:
+            try:
+                await self.sync()
+            except SYNC_ERRORS as error:
+                self.n_failures += 1
+                delay = min(self.max_backoff, self.interval * 2 ** (self.n_failures - 1)) * random.uniform(0.5, 1)
+
+                if self.is_online or self.n_failures == 1:
+                    print(f"COULDN'T REACH THE LEADERBOARD SERVICE! {error!r} Retrying in {delay:.1f}s.")
+                self.is_online = False
+
+                await self.wait(delay, is_wakeable=False)
+                continue
+
+            self.n_failures = 0
+            self.is_online = True
+
+            await self.wait(self.interval, is_wakeable=True)
+
+    async def wait(self, delay, is_wakeable):
+        deadline = self.loop.time() + delay
+
+        while not self.is_stopping and self.loop.time() < deadline:
+            try:
+                await asyncio.wait_for(self.wake.wait(), deadline - self.loop.time())
+            except asyncio.TimeoutError:
+                return
+
+            self.wake.clear()
+            if is_wakeable:
+                return
+
+    async def sync(self):
+        """
+        Pushes the whole outbox, then pulls the leaderboards.
+        """
+
+        while not self.is_stopping:
+            rows = await asyncio.to_thread(database.get_unsynced_scores, self.batch_size)
+            if not rows:
+                break
+
+            await self.request("POST", "/scores", {"kiosk": self.kiosk_id, "scores": rows})
+            await asyncio.to_thread(database.mark_scores_synced, rows[-1][0])
+
+        leaderboards = await self.request("GET", f"/leaderboards?n={self.leaderboard_size}")
+        check_leaderboards(leaderboards)
+        is_changed = await asyncio.to_thread(database.set_remote_leaderboards, leaderboards)
+
+        if is_changed and self.on_update:
+            try:
+                self.on_update()
+            except Exception as error:
+                print(f"SYNC CALLBACK FAILED! {error!r}")
+
+    async def request(self, method, path, payload=None):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        head = (f"{method} {self.base_path}{path} HTTP/1.1\r\n"
+                f"Host: {self.host}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n")
+
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=self.ssl or None),
+                                                self.timeout)
+        try:
+            writer.write(head.encode() + body)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), self.timeout)  # The service closes after responding
+        finally:
+            writer.close()
+
+        status_line, _, rest = response.partition(b"\r\n")
+        _, _, response_body = rest.partition(b"\r\n\r\n")
+
+        status = status_line.split(b" ", 2)
+        if len(status) < 2 or status[1] != b"200":
+            raise SyncError(f"{method} {path} answered {status_line.decode(errors='replace')!r}")
+
+        return json.loads(response_body)
+
+
+def check_leaderboards(leaderboards):
+    """
+    Raises SyncError unless leaderboards has the shape set_remote_leaderboards takes, {difficulty: [[playerName, score],
+    ...]}.
+    """
+
+    if not isinstance(leaderboards, dict):
+        raise SyncError(f"/leaderboards answered a {type(leaderboards).__name__}, not an object")
+
+    for difficulty, scores in leaderboards.items():
+        if not isinstance(scores, list) or not all(isinstance(row, list) and len(row) == 2 for row in scores):
+            raise SyncError(f"/leaderboards answered a malformed {difficulty} leaderboard")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Syncs the local scores with a leaderboard service.")
+    parser.add_argument("url", help="e.g. http://127.0.0.1:8765")
+    parser.add_argument("--once", action="store_true", help="Syncs once and exits instead of running until Ctrl+C")
+    parser.add_argument("--interval", type=float, default=10)
+    args = parser.parse_args()
+
+    score_sync = ScoreSync(args.url, interval=args.interval)
+
+    if args.once:
+        n_unsynced = database.query("SELECT COUNT(*) FROM syncOutbox;")[0][0]
+        try:
+            asyncio.run(score_sync.sync())
+        except SYNC_ERRORS as error:
+            n_left = database.query("SELECT COUNT(*) FROM syncOutbox;")[0][0]
+            print(f"COULDN'T REACH THE LEADERBOARD SERVICE! {error!r} Sent {n_unsynced - n_left} of {n_unsynced} "
+                  f"score(s), the rest stay in the outbox.")
+            raise SystemExit(1)
+
+        print(f"Sent {n_unsynced} score(s) as kiosk {score_sync.kiosk_id}")
+
+        for difficulty in ("EASY", "NORMAL", "HARD"):
+            print(difficulty, database.get_shared_high_scores(difficulty, 3))
+        return
+
+    score_sync.on_update = lambda: print("Leaderboards updated")
+    score_sync.start()
+
+    try:
+        score_sync.thread.join()
+    except KeyboardInterrupt:
+        score_sync.close()
+
+
+if __name__ == "__main__":
+    main()
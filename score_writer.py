@@ -0,0 +1,167 @@
+"""
+Writes scores (and the workouts that go with them) to the database on a background thread, so a busy disk can't stall
+the frame the player died on. That frame's reads (the GAME OVER summary) are queued in between with submit_task.
+"""
+
+import sqlite3
+from queue import Queue, Empty
+from threading import Thread
+from time import perf_counter
+import database
+from metrics import metrics
+
+_STOP = object()
+_WORKOUT = object()  # Marks a queued workout row, everything else that's queued is a score row
+_TASK = object()  # Marks a queued function
+
+
+class ScoreWriter:
+    def __init__(self, path=None, on_durable=None, max_pending=256, max_batch_size=64, batch_wait=0.05):
+        """
+        on_durable is called from the writer thread with the rows of every batch once it has been committed.
+        submit() only blocks if max_pending scores are already waiting to be written.
+        """
+
+        self.path = path or database.db_path
+        self.on_durable = on_durable
+
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait
+
+        self.queue = Queue(max_pending)
+        self.thread = Thread(target=self.run, name="ScoreWriter", daemon=True)
+        self.thread.start()
+
+    def submit(self, player_name, difficulty, score):
+        self.queue.put((player_name, difficulty, score))
+
+    def submit_workout(self, player_name, difficulty, duration, n_reps, signal_rate, rep_times, signal):
+        self.queue.put((_WORKOUT, (player_name, difficulty, duration, n_reps, signal_rate, rep_times, signal)))
+
+    def submit_task(self, function):
+        """
+        Calls function on the writer thread once everything submitted before it has been written, and before anything
+        submitted after it is. For the database reads that shouldn't hold up a frame either.
+        """
+
+        self.queue.put((_TASK, function))
+
+    def flush(self):
+        """
+        Waits until every submitted score has been written.
+        """
+
+        self.queue.join()
+
+    def close(self):
+        """
+        Writes the pending scores and stops the thread.
+        """
+
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+
+    def get_batch(self):
+        batch = [self.queue.get()]
+        deadline = perf_counter() + self.batch_wait
+
+        while len(batch) < self.max_batch_size and batch[-1] is not _STOP:
+            try:
+                batch.append(self.queue.get(timeout=max(0, deadline - perf_counter())))
+            except Empty:
+                break
+
+        return batch
+
+    def run(self):
+        connection = database.connect(self.path)
+
+        while True:
+            batch = self.get_batch()
+
+            # A task splits the batch, so it runs after what was submitted before it and before what came after
+            items = []
+            for item in batch:
+                if item is not _STOP and item[0] is _TASK:
+                    self.write_items(connection, items)
+                    items = []
+                    self.run_task(item[1])
+                elif item is not _STOP:
+                    items.append(item)
+            self.write_items(connection, items)
+
+            for _ in batch:
+                self.queue.task_done()
+
+            if batch[-1] is _STOP:
+                break
+
+        connection.close()
+
+    def write_items(self, connection, items):
+        rows = [item for item in items if item[0] is not _WORKOUT]
+        workouts = [item[1] for item in items if item[0] is _WORKOUT]
+
+        if rows:
+            self.write(connection, rows)
+        if workouts:
+            self.write_workouts(connection, workouts)
+
+    @staticmethod
+    def run_task(function):
+        try:
+            function()
+        except Exception as error:
+            print(f"SCORE WRITER TASK FAILED! {error!r}")
+
+    def write(self, connection, rows):
+        start = perf_counter()
+
+        try:
+            database.insert_scores(rows, connection)
+        except sqlite3.IntegrityError:
+            n_rows = len(rows)
+            rows = self.write_one_by_one(connection, rows)  # So one bad row doesn't lose the whole batch
+            metrics.db_write_failures.inc(n_rows - len(rows))
+        except sqlite3.Error as error:
+            print(f"COULDN'T SAVE {len(rows)} SCORE(S)! {error}")
+            metrics.db_write_failures.inc(len(rows))
+            return
+        finally:
+            metrics.db_write_latency.observe(perf_counter() - start)
+
+        if not rows:
+            return
+
+        if self.on_durable:
+            try:
+                self.on_durable(rows)
+            except Exception as error:
+                print(f"SCORE CALLBACK FAILED! {error!r}")
+
+    @staticmethod
+    def write_workouts(connection, rows):
+        try:
+            database.insert_workouts(rows, connection)
+        except sqlite3.IntegrityError:
+            for row in rows:  # So one bad row doesn't lose the whole batch
+                try:
+                    database.insert_workouts((row,), connection)
+                except sqlite3.Error as error:
+                    print(f"COULDN'T SAVE THE WORKOUT OF {row[0]}! {error}")
+        except sqlite3.Error as error:
+            print(f"COULDN'T SAVE {len(rows)} WORKOUT(S)! {error}")
+
+    @staticmethod
+    def write_one_by_one(connection, rows):
+        written = []
+
+        for row in rows:
+            try:
+                database.insert_scores((row,), connection)
+                written.append(row)
+            except sqlite3.Error as error:
+                print(f"COULDN'T SAVE THE SCORE {row}! {error}")
+
+        return written
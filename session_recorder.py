@@ -0,0 +1,225 @@
+"""
+Records MIDDLE GAME sessions to a compact, append-only binary file and replays them through the GameMode1 rules.
+
+A recording is a fixed-size header followed by one fixed-size record per frame, so it can be memory-mapped and read
+at any frame without parsing the frames before it. The header holds everything the rules need to make the same
+decisions again: the RNG seed, the difficulty, the window and tile size and the player's position. Each record holds
+the frame time, whether the camera was sampled on that frame, the shoulder landmarks and the movement percentage.
+
+Usage:
+    python session_recorder.py info Recordings/some-session.msr
+    python session_recorder.py replay Recordings/some-session.msr [--realtime]
+"""
+
+import os
+import argparse
+import mmap
+import struct
+from datetime import datetime
+from os.path import join as path_join
+from time import perf_counter, sleep
+import settings
+
+MAGIC = b"MSRC"
+VERSION = 1
+
+# magic, version, seed, difficulty, window width/height, tile width/height, player x/y
+HEADER = struct.Struct("<4sHq8sHHHHdd")
+# frame_n, frame time (s), flags, left shoulder x/y, right shoulder x/y, movement percentage
+RECORD = struct.Struct("<IfBx4hd")
+
+SAMPLED = 1  # The camera was read on this frame
+DETECTED = 2  # The pose model found the body on this frame
+
+
+class SessionRecorder:
+    def __init__(self, path, seed, difficulty, tile_size, player_pos, flush_every_n_frames=60):
+        self.path = path
+        self.flush_every_n_frames = flush_every_n_frames
+
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, difficulty.encode(), *settings.WINDOW_SIZE, *tile_size,
+                                    *player_pos))
+
+        self.frame_n = 0
+        self.last_frame_time = perf_counter()
+
+    def write_frame(self, has_sampled, body_parts, percentage):
+        now = perf_counter()
+        frame_time, self.last_frame_time = now - self.last_frame_time, now
+
+        flags = SAMPLED if has_sampled else 0
+        landmarks = (0, 0, 0, 0)
+
+        if has_sampled and body_parts:
+            flags |= DETECTED
+            landmarks = (*body_parts[11][1:], *body_parts[12][1:])
+
+        self.file.write(RECORD.pack(self.frame_n, frame_time, flags, *landmarks, percentage))
+        self.frame_n += 1
+
+        if self.frame_n % self.flush_every_n_frames == 0:
+            self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def start_recording(seed, difficulty, tile_size, player_pos):
+    """
+    Starts a recording in settings.RECORDINGS_DIR named after the time, the player and the difficulty.
+    """
+
+    os.makedirs(settings.RECORDINGS_DIR, exist_ok=True)
+    name = f"{datetime.now():%Y%m%d-%H%M%S}-{settings.user}-{difficulty}.msr"
+
+    return SessionRecorder(path_join(settings.RECORDINGS_DIR, name), seed, difficulty, tile_size, player_pos)
+
+
+class SessionReader:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.seed, difficulty, *sizes, player_x, player_y = HEADER.unpack_from(self.data)
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} session recording")
+
+        self.difficulty = difficulty.rstrip(b"\0").decode()
+        self.window_size = tuple(sizes[:2])
+        self.tile_size = tuple(sizes[2:])
+        self.player_pos = (player_x, player_y)
+
+        # A recording cut short by a crash can end in a partial record, which is ignored
+        self.n_frames = (len(self.data) - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.n_frames
+
+    def __getitem__(self, frame_n):
+        if not 0 <= frame_n < self.n_frames:
+            raise IndexError(frame_n)
+
+        return RECORD.unpack_from(self.data, HEADER.size + frame_n * RECORD.size)
+
+    def __iter__(self):
+        for frame_n in range(self.n_frames):
+            yield RECORD.unpack_from(self.data, HEADER.size + frame_n * RECORD.size)
+
+    def get_duration(self):
+        return sum(record[1] for record in self)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+class ReplayMovementAnalyser:
+    """
+    Stands in for MovementAnalyser and hands back the recorded samples, in order, instead of reading the camera.
+    """
+
+    def __init__(self, reader):
+        self.samples = [record for record in reader if record[2] & SAMPLED]
+        self.sample_n = -1
+
+        self.body_parts = []
+        self.percentage = 0
+
+        self.video_recorder = None
+
+    def get_positions(self):
+        self.sample_n += 1
+
+        if self.sample_n >= len(self.samples):
+            return
+
+        _, _, flags, left_x, left_y, right_x, right_y, self.percentage = self.samples[self.sample_n]
+
+        self.body_parts = []
+        if flags & DETECTED:
+            self.body_parts = [[i, 0, 0] for i in range(11)] + [[11, left_x, left_y], [12, right_x, right_y]]
+
+    def get_movement_percentage(self):
+        return self.percentage
+
+    def reset(self):
+        self.sample_n = -1
+        self.body_parts = []
+        self.percentage = 0
+
+    def close_analyser(self):
+        pass
+
+
+def replay(path, realtime=False):
+    """
+    Runs a recording through the headless engine. Returns the engine's RunReport and whether the replay died on the
+    same frame as the recording ended.
+    """
+
+    from headless import HeadlessEngine, RunReport
+
+    reader = SessionReader(path)
+
+    engine = HeadlessEngine(reader.difficulty, seed=reader.seed, window_size=reader.window_size,
+                            n_vertical_tiles=reader.window_size[1] // reader.tile_size[1],
+                            movement_analyser=ReplayMovementAnalyser(reader))
+    engine.rules.player.pos = reader.player_pos
+
+    start = perf_counter()
+    elapsed = 0
+
+    for _, frame_time, *_ in reader:
+        if realtime:
+            elapsed += frame_time
+            sleep(max(0, elapsed - (perf_counter() - start)))
+
+        if engine.step():
+            break
+
+    is_reproduced = engine.is_over and engine.frame_n == len(reader)
+    reader.close()
+
+    return RunReport(reader.difficulty, engine.frame_n, engine.is_over, engine.step_times), is_reproduced
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspects and replays recorded sessions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    info_parser = subparsers.add_parser("info")
+    info_parser.add_argument("path")
+
+    replay_parser = subparsers.add_parser("replay")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--realtime", action="store_true", help="Replays at the recorded frame timing")
+
+    args = parser.parse_args()
+
+    if args.command == "info":
+        reader = SessionReader(args.path)
+        samples = [record for record in reader if record[2] & SAMPLED]
+        n_detected = sum(1 for record in samples if record[2] & DETECTED)
+        frame_times = sorted(record[1] for record in reader)
+
+        print(f"{args.path}: {reader.difficulty}, seed {reader.seed}, window {reader.window_size}")
+        print(f"{len(reader)} frames over {reader.get_duration():.2f}s, {len(samples)} camera samples "
+              f"({len(samples) - n_detected} without a detected body)")
+        if frame_times:
+            print(f"Frame time: median {frame_times[len(frame_times) // 2] * 1000:.1f}ms, "
+                  f"slowest {frame_times[-1] * 1000:.1f}ms")
+
+        reader.close()
+
+    elif args.command == "replay":
+        report, is_reproduced = replay(args.path, args.realtime)
+
+        print(report)
+        print("The replay matches the recording." if is_reproduced else "The replay DIVERGED from the recording!")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,48 @@
 import pygame
 from os.path import join as path_join
+from assets import assets
 
-WINDOW_LOGO = pygame.image.load(path_join("Images", "Muscle Survivors Logo.png"))
+WINDOW_LOGO = assets.get_image(path_join("Images", "Muscle Survivors Logo.png"))
 WINDOW_SIZE = (0, 0)
 WINDOW_CAPTION = "Muscle Survivors"
 FPS = 60
 
+PROFILING = False
+PROFILE_EXPORT_PATH = "frame_profile.csv"
+
+# Dynamic resolution (see resolution_scaler.py): the game world is drawn smaller and scaled up to the display while
+# drawing it takes longer than RENDER_TIME_BUDGET seconds a frame. The HUD text can still be drawn at full resolution.
+DYNAMIC_RESOLUTION = True
+RENDER_SCALES = (1.0, 0.75, 0.5)
+RENDER_TIME_BUDGET = 0.008
+HUD_AT_NATIVE_RESOLUTION = True
+
+# Serves frame, pose and database metrics for Prometheus on http://METRICS_HOST:METRICS_PORT/metrics (see metrics.py).
+# None turns the server off. The default host only answers the kiosk itself, "0.0.0.0" lets a remote Prometheus
+# scrape it.
+METRICS_PORT = None
+METRICS_HOST = "127.0.0.1"
+
+# Database upkeep while nobody is playing (see db_maintenance.py). Scores older than ARCHIVE_SCORES_AFTER_MONTHS are
+# moved to monthly archives in ARCHIVE_DIR, except the best ARCHIVE_KEEP_TOP of each difficulty and every player's
+# bests; None keeps them all in game.db.
+IDLE_MAINTENANCE = True
+ARCHIVE_SCORES_AFTER_MONTHS = None
+ARCHIVE_KEEP_TOP = 100
+ARCHIVE_DIR = "Archive"
+
+RECORD_SESSIONS = False
+RECORDINGS_DIR = "Recordings"
+
+# Records the raw camera feed of each run to RECORDINGS_DIR in the background (see video_recorder.py).
+# RECORD_VIDEO_SECONDS keeps only the last seconds of a run, saved if it ends in GAME OVER; None records all of it.
+RECORD_VIDEO = False
+RECORD_VIDEO_SECONDS = None
+
+# The shared leaderboard service (see score_sync.py), e.g. "http://127.0.0.1:8765". None keeps the leaderboards local.
+SYNC_URL = None
+SYNC_INTERVAL = 10
+
 game_state = "SIGN IN"
 SCREEN = pygame.Surface((0, 0))
 
@@ -0,0 +1,321 @@
+"""
+Runs the game's shoulder-based movement analysis on recorded workout videos, in parallel.
+
+Every video is split into chunks of --chunk-frames frames and the chunks are spread over a process pool with a Pose
+model in each process, so a single long video keeps every core busy as well. The workers only find the shoulders. A
+video has no UP!/DOWN! calibration, so once all of a video's chunks are in, its shoulder height percentiles
+(--up-percentile and --down-percentile) are taken as the two poses, and every frame gets its movement percentage from
+MovementAnalyser.get_movement_percentage and its reps from RepCounter, the same as in the game.
+
+The frames are written as each video finishes, to a .csv file (optionally .gz), a .parquet file (needs pyarrow) or,
+with --db, the videoFrames table of the game's database.
+
+Usage:
+    python video_analysis.py workout1.mp4 workout2.mp4 --out results.csv
+    python video_analysis.py long_session.mp4 --out results.parquet --workers 8 --chunk-frames 1800
+    python video_analysis.py sessions/*.mp4 --db
+"""
+
+import argparse
+import csv
+import gzip
+import os
+from array import array
+from multiprocessing import Pool
+from time import perf_counter
+import cv2
+from mediapipe import solutions as mp_solutions
+import numpy as np
+from movement_analyser import MovementAnalyser
+from rep_counter import RepCounter
+
+COLUMNS = ("video", "frame", "time", "leftShoulderX", "leftShoulderY", "rightShoulderX", "rightShoulderY",
+           "percentage", "reps")
+WRITE_BATCH_SIZE = 5000
+
+# The Pose model tracks the body from the frames before, so each chunk starts this many frames early and throws them
+# away, instead of starting with a cold (or another chunk's) tracker. The landmarks still differ from one long run's
+# by a few pixels, the tracking depends on the whole path.
+WARMUP_FRAMES = 30
+
+pose = None  # Each worker process's own model, made by init_worker
+
+
+class VideoMovementAnalyser(MovementAnalyser):
+    """
+    A MovementAnalyser without a camera, for get_movement_percentage on landmarks found elsewhere.
+    """
+
+    def __init__(self, mean_up_shoulder_y, mean_down_shoulder_y):
+        super().__init__(camera=None)
+
+        self.mean_up_shoulder_y = mean_up_shoulder_y
+        self.mean_down_shoulder_y = mean_down_shoulder_y
+        self.landmarks = [[id, 0, 0] for id in range(33)]
+
+    def set_shoulders(self, left_x, left_y, right_x, right_y):
+        self.landmarks[11][1:] = left_x, left_y
+        self.landmarks[12][1:] = right_x, right_y
+        self.body_parts = self.landmarks
+
+    def clear(self):
+        self.body_parts = []
+
+
+def init_worker():
+    global pose
+
+    cv2.setNumThreads(1)  # The pool already has a process per core
+    pose = mp_solutions.pose.Pose(min_detection_confidence=0.7, min_tracking_confidence=0.7)
+
+
+def analyse_chunk(task):
+    """
+    Returns the shoulders found in frames start to end (the end of the video if end is None) as a flat array of
+    left x, left y, right x, right y for each frame, all -1 where the body wasn't found.
+    """
+
+    path, start, end = task
+    frame_n = max(0, start - WARMUP_FRAMES)
+
+    capture = cv2.VideoCapture(path)
+    if frame_n:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, frame_n)
+
+    shoulders = array("i")
+
+    while end is None or frame_n < end:
+        success, image = capture.read()
+        if not success:
+            break
+
+        image = MovementAnalyser.preprocess_image(image)
+        result = pose.process(image)
+
+        if frame_n < start:  # Warming up
+            pass
+        elif result.pose_landmarks:
+            h, w, _ = image.shape
+            left_shoulder, right_shoulder = result.pose_landmarks.landmark[11:13]
+            shoulders.extend((int(left_shoulder.x * w), int(left_shoulder.y * h),
+                              int(right_shoulder.x * w), int(right_shoulder.y * h)))
+        else:
+            shoulders.extend((-1, -1, -1, -1))
+
+        frame_n += 1
+
+    capture.release()
+
+    return path, start, shoulders
+
+
+def probe(path):
+    """
+    Returns the (estimated) number of frames and the FPS of the video, or None if it can't be opened.
+    """
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        return None
+
+    n_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30
+    capture.release()
+
+    return n_frames, fps
+
+
+def make_tasks(path, n_frames, chunk_frames):
+    """
+    The frame count of some containers is only an estimate, so the last chunk always reads to the end of the video.
+    """
+
+    starts = range(0, max(1, n_frames), chunk_frames)
+
+    return [(path, start, start + chunk_frames if i < len(starts) - 1 else None) for i, start in enumerate(starts)]
+
+
+def get_video_rows(path, fps, shoulders, up_percentile, down_percentile):
+    """
+    Calibrates on the whole video, then yields a row for each frame.
+    """
+
+    shoulders = np.frombuffer(shoulders, np.int32).reshape(-1, 4)
+    is_found = shoulders[:, 0] >= 0
+    shoulder_y = (shoulders[:, 1] + shoulders[:, 3]) / 2
+
+    if is_found.any():
+        mean_up_y, mean_down_y = np.percentile(shoulder_y[is_found], (up_percentile, down_percentile)).tolist()
+    else:
+        print(f"NO BODY FOUND IN {path}!")
+        mean_up_y, mean_down_y = 0, 1
+
+    if mean_up_y == mean_down_y:
+        mean_down_y += 1  # A video where the shoulders never move
+
+    movement_analyser = VideoMovementAnalyser(mean_up_y, mean_down_y)
+    rep_counter = RepCounter()
+
+    for frame_n, (left_x, left_y, right_x, right_y) in enumerate(shoulders.tolist()):
+        if left_x >= 0:
+            movement_analyser.set_shoulders(left_x, left_y, right_x, right_y)
+        else:
+            movement_analyser.clear()
+            left_x = left_y = right_x = right_y = None
+
+        time = frame_n / fps
+        percentage = movement_analyser.get_movement_percentage()
+        rep_counter.add(percentage, time)
+
+        yield path, frame_n, round(time, 4), left_x, left_y, right_x, right_y, round(percentage, 4), rep_counter.n_reps
+
+    print(f"{path}: {len(shoulders)} frames, body found in {is_found.mean():.0%} of them, {rep_counter.n_reps} reps "
+          f"(UP! at y={mean_up_y:.0f}, DOWN! at y={mean_down_y:.0f})")
+
+
+class CsvWriter:
+    def __init__(self, path):
+        if path.endswith(".gz"):
+            self.file = gzip.open(path, "wt", newline="", encoding="utf-8")
+        else:
+            self.file = open(path, "w", newline="", encoding="utf-8")
+
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError("Writing .parquet files needs pyarrow (pip install pyarrow), or use a .csv file") from None
+
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([("video", pyarrow.string()), ("frame", pyarrow.int32()),
+                                      ("time", pyarrow.float64()), ("leftShoulderX", pyarrow.int32()),
+                                      ("leftShoulderY", pyarrow.int32()), ("rightShoulderX", pyarrow.int32()),
+                                      ("rightShoulderY", pyarrow.int32()), ("percentage", pyarrow.float64()),
+                                      ("reps", pyarrow.int32())])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        columns = [self.pyarrow.array(column, type=field.type) for column, field in zip(zip(*rows), self.schema)]
+        self.writer.write_table(self.pyarrow.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class DatabaseWriter:
+    def __init__(self):
+        import database  # Only now, so writing a file doesn't create or upgrade a game.db
+
+        self.database = database
+
+    def write(self, rows):
+        self.database.insert_video_frames(rows)
+
+    def close(self):
+        pass
+
+
+def get_writer(path):
+    if path is None:
+        return DatabaseWriter()
+
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return CsvWriter(path)
+    if path.endswith(".parquet"):
+        return ParquetWriter(path)
+
+    raise ValueError(f"Can't tell the format of {path}, use a .csv (optionally .gz) or .parquet file")
+
+
+def analyse_videos(paths, writer, n_workers=None, chunk_frames=900, up_percentile=5, down_percentile=95):
+    """
+    Returns how many frames were analysed.
+    """
+
+    tasks = []
+    videos = {}  # Path -> [FPS, chunks still to come, shoulders so far]
+
+    for path in paths:
+        info = probe(path)
+        if info is None:
+            print(f"COULDN'T OPEN {path}!")
+            continue
+
+        n_frames, fps = info
+        video_tasks = make_tasks(path, n_frames, chunk_frames)
+        tasks.extend(video_tasks)
+        videos[path] = [fps, len(video_tasks), array("i")]
+
+    n_analysed = 0
+
+    with Pool(n_workers, initializer=init_worker) as pool:
+        # In order, so each video's chunks come one after the other and the video can be written once its last is in
+        for path, start, shoulders in pool.imap(analyse_chunk, tasks):
+            video = videos[path]
+            video[1] -= 1
+            video[2].extend(shoulders)
+
+            if video[1]:
+                continue
+
+            fps, _, video_shoulders = videos.pop(path)
+            n_analysed += len(video_shoulders) // 4
+
+            batch = []
+            for row in get_video_rows(path, fps, video_shoulders, up_percentile, down_percentile):
+                batch.append(row)
+
+                if len(batch) == WRITE_BATCH_SIZE:
+                    writer.write(batch)
+                    batch = []
+
+            if batch:
+                writer.write(batch)
+
+    return n_analysed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyses the movement in recorded workout videos.")
+    parser.add_argument("videos", nargs="+")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--out", help="A .csv, .csv.gz or .parquet file")
+    output.add_argument("--db", action="store_true", help="Writes to the videoFrames table of the game's database")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-frames", type=int, default=900, help="Frames each task analyses")
+    parser.add_argument("--up-percentile", type=float, default=5, help="Shoulder height percentile taken as UP!")
+    parser.add_argument("--down-percentile", type=float, default=95, help="Shoulder height percentile taken as DOWN!")
+    args = parser.parse_args()
+
+    try:
+        writer = get_writer(args.out)
+    except ValueError as error:
+        parser.error(str(error))
+
+    start = perf_counter()
+    try:
+        n_frames = analyse_videos(args.videos, writer, args.workers, args.chunk_frames, args.up_percentile,
+                                  args.down_percentile)
+    finally:
+        writer.close()
+
+    duration = perf_counter() - start
+    print(f"Analysed {n_frames} frames in {duration:.1f}s ({n_frames / duration:.1f} frames/s with {args.workers} "
+          f"worker(s))")
+
+
+if __name__ == "__main__":
+    main()
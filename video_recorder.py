@@ -0,0 +1,149 @@
+"""
+Records the raw camera feed of a run in the background, for debugging the pose tracking.
+
+MovementAnalyser.get_positions hands every camera frame to push(), which only puts it in a bounded queue: the frame
+isn't copied (the camera makes a new array for each one) and a full queue drops it instead of waiting, so recording
+never slows the game down. A thread takes the frames off the queue and encodes them; OpenCV lets go of the GIL while
+it encodes, so the thread hardly competes with the main loop. The frames dropped are counted in
+metrics.video_frames_dropped and printed when the recording closes.
+
+The camera is only read every few game frames, and not always at the same rate, so the frames are written at their
+capture times: a frame is repeated or skipped to keep the video in step with the run.
+
+With keep_seconds, only the last keep_seconds of the run are kept, as JPEGs in a ring that forgets the oldest frame,
+and they are only written to the video when the run is closed with is_saved (it ended in GAME OVER).
+
+The thread is a daemon, so a game that crashes mid-run still exits with its traceback. An atexit hook closes the
+recordings still open (without saving a keep_seconds ring) and waits for their files to be finished.
+"""
+
+import atexit
+import os
+from collections import deque
+from datetime import datetime
+from os.path import join as path_join
+from queue import Queue, Empty, Full
+from threading import Thread
+from time import perf_counter
+import cv2
+import settings
+from metrics import metrics
+
+JPEG_QUALITY = 90
+
+_recorders = set()  # The recorders whose thread is still running, finished by finish_recordings at exit
+
+
+class VideoRecorder:
+    def __init__(self, path, fps=15, keep_seconds=None, max_queued=30):
+        self.path = path
+        self.fps = fps
+        self.keep_seconds = keep_seconds
+
+        self.queue = Queue(max_queued)  # (capture time, frame)
+        self.is_closing = False
+        self.is_saved = True
+
+        self.n_pushed = 0
+        self.n_dropped = 0
+
+        self.writer = None  # Made from the size of the first frame written
+        self.start_time = 0
+        self.n_written = 0
+
+        _recorders.add(self)
+        self.thread = Thread(target=self.run, name="VideoRecorder", daemon=True)
+        self.thread.start()
+
+    def push(self, frame):
+        """
+        Called on the main loop. Returns False if the frame was dropped.
+        """
+
+        if self.is_closing:
+            return False
+
+        self.n_pushed += 1
+        try:
+            self.queue.put_nowait((perf_counter(), frame))
+        except Full:
+            self.n_dropped += 1
+            metrics.video_frames_dropped.inc()
+            return False
+
+        return True
+
+    def close(self, is_saved=True):
+        """
+        Returns straight away, the thread writes what's left. In keep_seconds mode nothing is written unless is_saved.
+        """
+
+        self.is_saved = is_saved
+        self.is_closing = True
+
+    def run(self):
+        ring = None
+        if self.keep_seconds is not None:
+            ring = deque(maxlen=max(1, round(self.keep_seconds * self.fps)))  # (capture time, JPEG)
+
+        while True:
+            try:
+                time, frame = self.queue.get(timeout=0.1)
+            except Empty:
+                if self.is_closing:
+                    break
+                continue
+
+            if ring is None:
+                self.write(time, frame)
+                continue
+
+            success, jpeg = cv2.imencode(".jpg", frame, (cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY))
+            if success:
+                ring.append((time, jpeg))
+
+        if ring and self.is_saved:
+            for time, jpeg in ring:
+                self.write(time, cv2.imdecode(jpeg, cv2.IMREAD_COLOR))
+
+        if self.writer is not None:
+            self.writer.release()
+
+        if self.n_dropped:
+            print(f"VIDEO RECORDER DROPPED {self.n_dropped} OF {self.n_pushed} FRAMES!")
+
+        _recorders.discard(self)
+
+    def write(self, time, frame):
+        if self.writer is None:
+            height, width = frame.shape[:2]
+            self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*"MJPG"), self.fps, (width, height))
+            if not self.writer.isOpened():
+                print(f"COULDN'T OPEN {self.path} FOR WRITING!")
+            self.start_time = time
+
+        n_due = round((time - self.start_time) * self.fps) + 1  # How many frames the video should have by now
+        while self.n_written < n_due:
+            self.writer.write(frame)
+            self.n_written += 1
+
+
+@atexit.register
+def finish_recordings():
+    for recorder in list(_recorders):
+        if not recorder.is_closing:  # The game didn't get to close it, e.g. it crashed mid-run
+            recorder.close(is_saved=False)
+
+        recorder.thread.join()
+
+
+def start_recording(difficulty, fps):
+    """
+    Starts a recording in settings.RECORDINGS_DIR named after the time, the player and the difficulty, next to the
+    session recordings.
+    """
+
+    os.makedirs(settings.RECORDINGS_DIR, exist_ok=True)
+    name = f"{datetime.now():%Y%m%d-%H%M%S}-{settings.user}-{difficulty}.avi"
+
+    return VideoRecorder(path_join(settings.RECORDINGS_DIR, name), fps, settings.RECORD_VIDEO_SECONDS)